@@ -1,8 +1,10 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_login import LoginManager
+from flask_migrate import Migrate
 from config import config
-from models import db, User
+from models import db
+from services import rollups, search, notifications, outbox, mailer, events, user_cache, passwords, login_identifiers, pool_metrics, request_metrics, metrics
 import os
 
 def create_app(config_name=None):
@@ -13,7 +15,20 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     
     # Initialize extensions
+    pool_metrics.init_app(app)  # before db.init_app, which creates the engine
     db.init_app(app)
+    Migrate(app, db, render_as_batch=True)
+    rollups.init_app(app)
+    search.init_app(app)
+    notifications.init_app(app)
+    outbox.init_app(app)
+    mailer.init_app(app)
+    events.init_app(app)
+    user_cache.init_app(app)
+    passwords.init_app(app)
+    login_identifiers.init_app(app)
+    request_metrics.init_app(app)
+    metrics.init_app(app)
     CORS(app, supports_credentials=True, origins=[
         'http://localhost:3001',
         'https://mc-one-tau.vercel.app'
@@ -26,7 +41,7 @@ def create_app(config_name=None):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load_user(int(user_id))
     
     # Create upload folder if it doesn't exist
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -0,0 +1,1166 @@
+"""
+Benchmark script for API hot paths
+Seeds a scratch database, then reports SQL statement counts and latency
+for the selected endpoints.
+
+Usage:
+    python benchmark.py auth --sizes 100000
+    python benchmark.py lookup --sizes 100000 1000000
+    python benchmark.py login --sizes 10000 --concurrency 1 4 16 --methods pbkdf2:sha256 scrypt
+    python benchmark.py dashboard --sizes 10000 100000 1000000
+    python benchmark.py regional --sizes 10000
+    python benchmark.py listing --sizes 2000
+    python benchmark.py paging --sizes 10000 100000
+    python benchmark.py explain --sizes 20000
+    python benchmark.py courtship
+    python benchmark.py provisioning --sizes 1000 5000
+    python benchmark.py completion --sizes 5000
+    python benchmark.py search --sizes 500000
+    python benchmark.py fanout --sizes 500
+    python benchmark.py email --sizes 2000 --concurrency 1 4
+    python benchmark.py gunicorn --sizes 10000 --concurrency 16 --profiles sync gthread gevent
+
+Set TEST_DATABASE_URL to benchmark against PostgreSQL; by default a
+temporary SQLite file is used.
+"""
+import argparse
+import http.cookiejar
+import importlib.util
+import json
+import os
+import re
+import random
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    _scratch = os.path.join(tempfile.mkdtemp(prefix='mc-bench-'), 'bench.db')
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{_scratch}'
+
+from sqlalchemy import event, insert
+from app import create_app
+from models import db, User, Application, StageHistory, CheckIn, Notification, Discussion, CourtshipProgress
+from services.courtship import provision_courtships
+from services.notifications import create_notifications, rebuild_unread_counts
+from services.login_identifiers import find_user, rebuild_login_identifiers, taken
+from services.mailer import run_worker as run_email_worker
+from services.pagination import encode_cursor
+from services.passwords import PasswordPolicy
+from services.rollups import rebuild_rollups
+
+REGIONS = ['Greater Accra', 'Ashanti', 'Central', 'Eastern', 'Western', 'Volta',
+           'Northern', 'Upper East', 'Upper West', 'Bono', 'Ahafo', 'Oti']
+STAGES = ['application_submitted', 'form_review', 'interview', 'medical_tests_requested',
+          'first_meeting_scheduled', 'courtship', 'engagement', 'wedding']
+STATUSES = ['pending', 'approved', 'rejected', 'on_hold']
+PASSWORD = 'bench-password'
+CHUNK = 10000
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def count_queries(engine):
+    """Collect every (statement, parameters) pair executed on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, int(round(pct / 100.0 * len(ordered))) - 1)
+    return ordered[index]
+
+
+def measure(app, client, method, path, repeats=20, **kwargs):
+    """Hit an endpoint repeatedly; return (queries per call, p50 ms, p95 ms)
+
+    Must be called outside an app context so every request gets a fresh
+    session, exactly like production.
+    """
+    with app.app_context():
+        engine = db.engine
+    timings = []
+    queries = 0
+    for _ in range(repeats):
+        with count_queries(engine) as statements:
+            start = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise SystemExit(f'{method} {path} failed: {response.status_code} {response.get_data(as_text=True)}')
+        queries = len(statements)
+    return queries, statistics.median(timings), percentile(timings, 95)
+
+
+def reset_database():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+
+def bulk_insert(model, rows):
+    """Core bulk insert; bypasses the ORM unit of work, so rebuild rollups
+    and unread counts afterwards"""
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[i:i + CHUNK])
+    db.session.commit()
+
+
+def create_login_user(username, role, region='Greater Accra'):
+    user = User(
+        email=f'{username}@bench.local',
+        username=username,
+        full_name=username.replace('_', ' ').title(),
+        role=role,
+        region=region,
+        division=f'{region} Central',
+        local_church=f'{region} Assembly',
+        gender='male',
+        is_active=True
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(app, username):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+    if response.status_code != 200:
+        raise SystemExit(f'Login failed for {username}: {response.get_data(as_text=True)}')
+    return client
+
+
+def seed_singles(count, regions=REGIONS):
+    """Insert active singles spread over the given regions"""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        region = regions[i % len(regions)]
+        rows.append({
+            'email': f'single{i}@bench.local',
+            'username': f'single{i}',
+            'password_hash': 'x',
+            'full_name': f'Single Person {i}',
+            'role': 'single',
+            'region': region,
+            'division': f'{region} Division {i % 4}',
+            'local_church': f'{region} Assembly',
+            'gender': 'male' if i % 2 else 'female',
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now,
+        })
+    bulk_insert(User, rows)
+    return [row[0] for row in db.session.query(User.id).filter(User.role == 'single').all()]
+
+
+def seed_applications(count, applicant_ids, assigned_to=None):
+    """Insert applications spread over the last two years"""
+    rng = random.Random(count)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+        rows.append({
+            'application_number': f'BENCH-{i:08d}',
+            'applicant_id': applicant_ids[i % len(applicant_ids)],
+            'applicant_type': 'brother' if i % 2 else 'sister',
+            'partner_name': f'Partner {i}',
+            'age': 25 + i % 15,
+            'occupation': 'Teacher',
+            'current_stage': rng.choice(STAGES),
+            'status': rng.choice(STATUSES),
+            'assigned_committee_member_id': assigned_to if i % 10 == 0 else None,
+            'created_at': created,
+            'updated_at': created,
+            'submitted_at': created,
+        })
+        if len(rows) == CHUNK:
+            bulk_insert(Application, rows)
+            rows = []
+    if rows:
+        bulk_insert(Application, rows)
+
+
+def report(label, queries, p50, p95):
+    print(f'  {label:<40} {queries:>4} queries   p50 {p50:8.2f} ms   p95 {p95:8.2f} ms')
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def bench_dashboard(app, args):
+    """GET /api/dashboard/stats for each role scope"""
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            central = create_login_user('bench_central', 'central_committee')
+            create_login_user('bench_committee', 'committee_member')
+            applicant_ids = seed_singles(min(size, 5000))
+            seed_applications(size, applicant_ids, assigned_to=central.id)
+            rebuild_rollups()
+
+        print(f'\n{size:,} applications')
+        for username in ['bench_central', 'bench_committee']:
+            client = login(app, username)
+            report(username, *measure(app, client, 'GET', '/api/dashboard/stats', repeats=args.repeats))
+
+
+def bench_regional(app, args):
+    """GET /api/dashboard/regional-statistics; statement count must not grow with regions"""
+    counts = {}
+    for region_count in [1, 4, len(REGIONS)]:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_central', 'central_committee')
+            applicant_ids = seed_singles(args.sizes[0] // 10 or 1, regions=REGIONS[:region_count])
+            seed_applications(args.sizes[0], applicant_ids)
+            rebuild_rollups()
+
+        client = login(app, 'bench_central')
+        queries, p50, p95 = measure(app, client, 'GET', '/api/dashboard/regional-statistics', repeats=args.repeats)
+        report(f'{region_count} regions', queries, p50, p95)
+        counts[region_count] = queries
+
+    if len(set(counts.values())) != 1:
+        raise SystemExit(f'FAIL: statement count varies with region count: {counts}')
+    print('OK: statement count is constant regardless of region count')
+
+
+def bench_listing(app, args):
+    """List endpoints; statement count must not grow with page size"""
+    with app.app_context():
+        reset_database()
+        create_login_user('bench_central', 'central_committee')
+        applicant_ids = seed_singles(500)
+        seed_applications(args.sizes[0], applicant_ids)
+        rebuild_rollups()
+
+        now = datetime.utcnow()
+        application_ids = [row[0] for row in db.session.query(Application.id).all()]
+        bulk_insert(StageHistory, [
+            {'application_id': app_id, 'stage_name': 'Form Review', 'stage_order': order,
+             'status': 'completed', 'started_at': now - timedelta(days=order)}
+            for app_id in application_ids for order in (1, 2)
+        ])
+        bulk_insert(CheckIn, [
+            {'application_id': app_id, 'scheduled_date': now + timedelta(days=1 + app_id % 20),
+             'status': 'scheduled'}
+            for app_id in application_ids
+        ])
+
+    client = login(app, 'bench_central')
+    paths = {
+        'applications': '/api/applications/?per_page={n}',
+        'recent-activity': '/api/dashboard/recent-activity?limit={n}',
+    }
+    failures = []
+    for name, template in paths.items():
+        counts = {}
+        for size in (20, 100):
+            queries, p50, p95 = measure(app, client, 'GET', template.format(n=size), repeats=args.repeats)
+            report(f'{name} ({size} rows)', queries, p50, p95)
+            counts[size] = queries
+        if counts[20] != counts[100]:
+            failures.append(f'{name}: {counts}')
+
+    for name, path in [('committee pending', '/api/committee/applications/pending'),
+                       ('upcoming check-ins', '/api/dashboard/upcoming-checkins')]:
+        report(name, *measure(app, client, 'GET', path, repeats=args.repeats))
+
+    if failures:
+        raise SystemExit('FAIL: statement count grows with page size: ' + '; '.join(failures))
+    print('OK: statement count is independent of page size')
+
+
+def walk_pages(client, path, key, cursor_mode, per_page=20):
+    """Collect ids from every page of a list endpoint"""
+    ids = []
+    page, cursor = 1, ''
+    while True:
+        if cursor_mode:
+            url = f'{path}?per_page={per_page}&cursor={cursor}'
+        else:
+            url = f'{path}?per_page={per_page}&page={page}'
+        data = client.get(url).get_json()
+        ids += [item['id'] for item in data[key]]
+        if cursor_mode:
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+        else:
+            if page >= data['pages']:
+                return ids
+            page += 1
+
+
+def bench_paging(app, args):
+    """Offset vs cursor pagination at increasing depth"""
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            central = create_login_user('bench_central', 'central_committee')
+            applicant_ids = seed_singles(500)
+            seed_applications(size, applicant_ids)
+            rebuild_rollups()
+            now = datetime.utcnow()
+            bulk_insert(Notification, [
+                {'user_id': central.id, 'title': f'Notification {i}', 'message': 'Benchmark',
+                 'notification_type': 'stage_update', 'read': i % 3 == 0,
+                 'created_at': now - timedelta(seconds=i // 2)}
+                for i in range(size)
+            ])
+            rebuild_unread_counts()
+            bulk_insert(Discussion, [
+                {'title': f'Discussion {i}', 'content': 'Benchmark', 'visibility': 'all_committees',
+                 'created_by_id': central.id, 'is_pinned': i % 50 == 0,
+                 'created_at': now - timedelta(seconds=i // 3)}
+                for i in range(min(size, 500))
+            ])
+
+            # Sort keys of the row just before each probed depth, to build
+            # the equivalent cursor
+            def cursor_before(model, offset):
+                row = db.session.query(model.created_at, model.id).order_by(
+                    model.created_at.desc(), model.id.desc()
+                ).offset(offset - 1).first()
+                return encode_cursor(row)
+
+            per_page = 20
+            probes = {}
+            for depth in (per_page, size // 2, size - per_page):
+                probes[depth] = {
+                    'applications': cursor_before(Application, depth),
+                    'notifications': cursor_before(Notification, depth),
+                }
+
+        client = login(app, 'bench_central')
+        print(f'\n{size:,} rows')
+        for name in ('applications', 'notifications'):
+            for depth, cursors in probes.items():
+                page = depth // per_page + 1
+                report(f'{name} offset page {page}',
+                       *measure(app, client, 'GET', f'/api/{name}/?per_page={per_page}&page={page}', repeats=args.repeats))
+                report(f'{name} cursor @{depth}',
+                       *measure(app, client, 'GET', f'/api/{name}/?per_page={per_page}&cursor={cursors[name]}', repeats=args.repeats))
+
+        # Cursor walks must visit the same rows in the same order as offset paging
+        if size <= 20000:
+            for path, key in [('/api/notifications/', 'notifications'), ('/api/admin/users', 'users'),
+                              ('/api/discussions/', 'discussions'), ('/api/applications/', 'applications')]:
+                offset_ids = walk_pages(client, path, key, cursor_mode=False, per_page=100)
+                cursor_ids = walk_pages(client, path, key, cursor_mode=True, per_page=100)
+                if sorted(offset_ids) != sorted(cursor_ids) or len(set(cursor_ids)) != len(cursor_ids):
+                    raise SystemExit(f'FAIL: cursor walk of {path} does not match offset paging')
+            print('OK: cursor walks visit every row exactly once')
+
+
+# Tables whose hot predicates are covered by indexes; a full scan of any of
+# them in the checked endpoints is a regression
+INDEXED_TABLES = {'applications', 'users', 'notifications', 'courtship_progress', 'check_ins'}
+
+
+def sequential_scans(connection, statement, parameters):
+    """Tables the planner would read with a full sequential scan"""
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        details = [row[-1] for row in plan]
+        pattern = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+    else:
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+        details = [row[0].strip() for row in plan]
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    tables = set()
+    for detail in details:
+        match = pattern.search(detail)
+        if match and match.group(1) in INDEXED_TABLES:
+            tables.add(match.group(1))
+    return tables
+
+
+def bench_explain(app, args):
+    """EXPLAIN every statement of the indexed endpoints; fail on sequential scans"""
+    with app.app_context():
+        reset_database()
+        central = create_login_user('bench_central', 'central_committee')
+        create_login_user('bench_committee', 'committee_member')
+        single = create_login_user('bench_single', 'single')
+        applicant_ids = seed_singles(2000)
+        seed_applications(args.sizes[0], applicant_ids, assigned_to=central.id)
+
+        couple = Application(
+            application_number='BENCH-COUPLE', applicant_id=single.id, applicant_type='brother',
+            partner_name='Bench Partner', current_stage='courtship', status='approved'
+        )
+        db.session.add(couple)
+        db.session.commit()
+        couple_id = couple.id
+
+        now = datetime.utcnow()
+        application_ids = [row[0] for row in db.session.query(Application.id).all()]
+        bulk_insert(CourtshipProgress, [
+            {'application_id': app_id, 'week_number': week,
+             'status': 'completed' if week < 5 else 'not_started'}
+            for app_id in set(application_ids[::10]) | {couple_id} for week in range(1, 26)
+        ])
+        bulk_insert(CheckIn, [
+            {'application_id': app_id, 'scheduled_date': now + timedelta(days=app_id % 200 - 100),
+             'status': 'scheduled' if app_id % 3 else 'completed'}
+            for app_id in application_ids
+        ])
+        bulk_insert(Notification, [
+            {'user_id': applicant_ids[i % len(applicant_ids)] if i % 4 else central.id,
+             'title': f'Notification {i}', 'message': 'Benchmark', 'read': i % 3 == 0,
+             'created_at': now - timedelta(minutes=i)}
+            for i in range(args.sizes[0])
+        ])
+        rebuild_rollups()
+        rebuild_unread_counts()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        engine = db.engine
+
+    checks = {
+        'bench_single': [
+            '/api/applications/',
+            '/api/dashboard/stats',
+            f'/api/courtship-tracking/progress/{couple_id}',
+            f'/api/courtship-tracking/progress/{couple_id}/current',
+        ],
+        'bench_committee': [
+            '/api/dashboard/stats',
+            '/api/committee/members',
+        ],
+        'bench_central': [
+            '/api/notifications/',
+            '/api/notifications/unread-count',
+            '/api/committee/applications/pending',
+            '/api/applications/?status=pending',
+            '/api/dashboard/upcoming-checkins',
+            '/api/dashboard/stats',
+        ],
+    }
+
+    failures = []
+    for username, paths in checks.items():
+        client = login(app, username)
+        for path in paths:
+            with count_queries(engine) as statements:
+                response = client.get(path)
+            if response.status_code >= 400:
+                raise SystemExit(f'GET {path} failed: {response.status_code}')
+            scanned = set()
+            with engine.connect() as connection:
+                for statement, parameters in statements:
+                    if statement.lstrip().upper().startswith('SELECT'):
+                        scanned |= sequential_scans(connection, statement, parameters)
+            status = 'SEQ SCAN ' + ', '.join(sorted(scanned)) if scanned else 'ok'
+            print(f'  {username:<16} {path:<55} {status}')
+            if scanned:
+                failures.append(f'{username} {path}')
+
+    if failures:
+        raise SystemExit('FAIL: sequential scans in ' + '; '.join(failures))
+    print('OK: no sequential scans on indexed tables')
+
+
+# Most SQL statements each courtship endpoint may run (user cache warm).
+# Each includes the one narrow read of the user's uncached authorization
+# columns (services/user_cache.py)
+COURTSHIP_BUDGETS = {
+    '/api/courtship-tracking/topics': 1,
+    '/api/courtship-tracking/topics/5': 1,
+    '/api/courtship-tracking/progress/{id}/current': 3,
+    '/api/courtship-tracking/progress/{id}': 4,
+    '/api/courtship/applications/{id}/progress': 3,
+}
+
+
+def bench_courtship(app, args):
+    """Courtship endpoints: fail if any runs more statements than its budget"""
+    with app.app_context():
+        reset_database()
+        single = create_login_user('bench_single', 'single')
+        partner = create_login_user('bench_partner', 'single')
+        couple = Application(
+            application_number='BENCH-COUPLE', applicant_id=single.id, partner_id=partner.id,
+            applicant_type='brother', partner_name='Bench Partner', current_stage='courtship', status='approved'
+        )
+        db.session.add(couple)
+        db.session.commit()
+        couple_id = couple.id
+
+        now = datetime.utcnow()
+        bulk_insert(CourtshipProgress, [
+            {'application_id': couple_id, 'week_number': week,
+             'status': 'completed' if week < 12 else 'not_started',
+             'completed_at': now - timedelta(days=7 * (12 - week)) if week < 12 else None,
+             'last_updated_by': single.id if week % 2 else partner.id}
+            for week in range(1, 26)
+        ])
+        bulk_insert(CheckIn, [
+            {'application_id': couple_id, 'scheduled_date': now + timedelta(days=30 * (month - 2)),
+             'completed_date': now - timedelta(days=30 * (2 - month)) if month < 3 else None,
+             'status': 'completed' if month < 3 else 'scheduled'}
+            for month in range(6)
+        ])
+
+    client = login(app, 'bench_single')
+    failures = []
+    for template, budget in COURTSHIP_BUDGETS.items():
+        queries, p50, p95 = measure(app, client, 'GET', template.format(id=couple_id), repeats=args.repeats)
+        report(template, queries, p50, p95)
+        if queries > budget:
+            failures.append(f'{template} ran {queries} statements (budget {budget})')
+
+    etag = client.get('/api/courtship-tracking/topics').headers.get('ETag')
+    queries, p50, p95 = measure(app, client, 'GET', '/api/courtship-tracking/topics', repeats=args.repeats,
+                                headers={'If-None-Match': etag})
+    report('/api/courtship-tracking/topics (304)', queries, p50, p95)
+    if client.get('/api/courtship-tracking/topics', headers={'If-None-Match': etag}).status_code != 304:
+        failures.append('/api/courtship-tracking/topics did not answer If-None-Match with 304')
+
+    if failures:
+        raise SystemExit('FAIL: ' + '; '.join(failures))
+    print('OK: every courtship endpoint is within its statement budget')
+
+
+def bench_completion(app, args):
+    """GET /api/dashboard/courtship-completion: per-couple COUNT loop vs one grouped query"""
+    path = '/api/dashboard/courtship-completion'
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_central', 'central_committee')
+            applicant_ids = seed_singles(size)
+            seed_applications(size, applicant_ids)
+            db.session.execute(db.update(Application).values(current_stage='courtship', status='approved'))
+            application_ids = db.session.scalars(db.select(Application.id)).all()
+            rng = random.Random(size)
+            rows = []
+            for application_id in application_ids:
+                done = rng.randint(0, 25)
+                rows.extend({'application_id': application_id, 'week_number': week,
+                             'status': 'completed' if week <= done else 'not_started'}
+                            for week in range(1, 26))
+                if len(rows) >= CHUNK:
+                    bulk_insert(CourtshipProgress, rows)
+                    rows = []
+            if rows:
+                bulk_insert(CourtshipProgress, rows)
+            rebuild_rollups()
+
+            # The old endpoint: every couple, two COUNTs and a lazy applicant load each
+            engine = db.engine
+            with count_queries(engine) as statements:
+                start = time.perf_counter()
+                for application in Application.query.filter_by(current_stage='courtship').all():
+                    CourtshipProgress.query.filter_by(application_id=application.id).count()
+                    CourtshipProgress.query.filter_by(application_id=application.id, status='completed').count()
+                    application.applicant.full_name
+                elapsed = (time.perf_counter() - start) * 1000
+            db.session.rollback()
+
+        print(f'\n{size:,} couples in courtship')
+        report('per-couple COUNTs (all rows)', len(statements), elapsed, elapsed)
+        client = login(app, 'bench_central')
+        for query in ('', '?sort=progress&order=asc', '?sort=applicant_name', f'?page={size // 100}&per_page=50'):
+            report(f'grouped {query or "(default)"}', *measure(app, client, 'GET', path + query, repeats=args.repeats))
+
+        data = client.get(path + '?per_page=200').get_json()
+        progress = [row['progress'] for row in data['courtship_data']]
+        if data['total'] != size or progress != sorted(progress, reverse=True):
+            raise SystemExit(f"FAIL: total {data['total']} for {size} couples or page not sorted by progress")
+        print('  OK: every couple counted, sorted by progress')
+
+
+def bench_provisioning(app, args):
+    """Batch courtship initialization: statements per batch, and a repeat that must add nothing"""
+    path = '/api/courtship/applications/initialize'
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_central', 'central_committee')
+            applicant_ids = seed_singles(size)
+            seed_applications(size, applicant_ids)
+            db.session.execute(db.update(Application).values(status='approved'))
+            db.session.commit()
+            application_ids = db.session.scalars(db.select(Application.id).order_by(Application.id)).all()
+            # One application initialized before, with only its first weeks left
+            provision_courtships(application_ids[:1])
+            db.session.execute(db.delete(CourtshipProgress).where(CourtshipProgress.week_number > 3))
+            db.session.commit()
+            engine = db.engine
+
+        print(f'\n{size:,} approved applications (one partly initialized)')
+        client = login(app, 'bench_central')
+        batches = [application_ids[i:i + 500] for i in range(0, len(application_ids), 500)]
+        for label in ('initialize', 'initialize again'):
+            queries = 0
+            initialized = 0
+            start = time.perf_counter()
+            for batch in batches:
+                with count_queries(engine) as statements:
+                    response = client.post(path, json={'application_ids': batch})
+                if response.status_code != 200:
+                    raise SystemExit(f'{path} returned {response.status_code}: {response.get_data(as_text=True)}')
+                queries = max(queries, len(statements))
+                initialized += len(response.get_json()['initialized'])
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f'  {label:<40} {queries:>4} queries/batch   {elapsed:8.1f} ms   {initialized:,} initialized')
+
+        with app.app_context():
+            progress = db.session.scalar(db.select(db.func.count()).select_from(CourtshipProgress))
+            check_ins = db.session.scalar(db.select(db.func.count()).select_from(CheckIn))
+        if progress != 25 * size or check_ins != 6 * size:
+            raise SystemExit(f'FAIL: {progress} progress rows and {check_ins} check-ins for {size} applications')
+        print('  OK: 25 weeks and 6 check-ins per application after two runs')
+
+
+def bench_search(app, args):
+    """Application search: legacy ILIKE scan vs the search index"""
+    terms = ['BENCH-00012345', 'Partner 4242', 'Person 42', 'no such name']
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_central', 'central_committee')
+            applicant_ids = seed_singles(min(size // 10, 50000) or 1)
+            seed_applications(size, applicant_ids)
+            rebuild_rollups()
+
+        print(f'\n{size:,} applications')
+        client = login(app, 'bench_central')
+        for term in terms:
+            with app.app_context():
+                pattern = f'%{term}%'
+                legacy = Application.query.join(User, Application.applicant_id == User.id).filter(db.or_(
+                    User.full_name.ilike(pattern),
+                    Application.partner_name.ilike(pattern),
+                    Application.application_number.ilike(pattern)
+                )).order_by(Application.created_at.desc())
+                timings = []
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    legacy.paginate(page=1, per_page=20, error_out=False)
+                    timings.append((time.perf_counter() - start) * 1000)
+                report(f'ILIKE "{term}"', 2, statistics.median(timings), percentile(timings, 95))
+            report(f'index "{term}"', *measure(app, client, 'GET', f'/api/applications/?search={term}',
+                                               repeats=args.repeats))
+
+
+def bench_fanout(app, args):
+    """Notify a region's committee: per-object ORM loop vs one INSERT ... SELECT"""
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_single', 'single')
+            bulk_insert(User, [
+                {'email': f'member{i}@bench.local', 'username': f'member{i}', 'password_hash': 'x',
+                 'full_name': f'Committee Member {i}', 'role': 'committee_member',
+                 'region': 'Greater Accra', 'is_active': True}
+                for i in range(size)
+            ])
+            rebuild_rollups()
+            members = db.select(User.id).filter_by(
+                role='committee_member', region='Greater Accra', is_active=True
+            )
+
+            timings = {'orm loop': [], 'insert-select': []}
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                for member in User.query.filter_by(
+                    role='committee_member', region='Greater Accra', is_active=True
+                ).all():
+                    db.session.add(Notification(
+                        user_id=member.id, title='New Marriage Application',
+                        message='Benchmark', notification_type='new_application'
+                    ))
+                db.session.commit()
+                timings['orm loop'].append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                create_notifications(members, 'New Marriage Application', 'Benchmark', 'new_application')
+                db.session.commit()
+                timings['insert-select'].append((time.perf_counter() - start) * 1000)
+
+            expected = 2 * args.repeats
+            wrong = db.session.query(User.id).filter(
+                User.role == 'committee_member', User.unread_notification_count != expected
+            ).count()
+            engine = db.engine
+
+        print(f'\n{size:,} committee members in the region')
+        for label, samples in timings.items():
+            print(f'  {label:<40}   p50 {statistics.median(samples):8.2f} ms   p95 {percentile(samples, 95):8.2f} ms')
+
+        client = login(app, 'bench_single')
+        with count_queries(engine) as statements:
+            response = client.post('/api/applications/', json={
+                'age': 30, 'occupation': 'Teacher', 'partner_name': 'Bench Partner',
+                'is_born_again': True, 'salvation_date': '2010-01-01'
+            })
+        if response.status_code != 201:
+            raise SystemExit(f'POST /api/applications/ failed: {response.get_data(as_text=True)}')
+        print(f'  POST /api/applications/ {len(statements)} statements')
+
+        if wrong:
+            raise SystemExit(f'FAIL: {wrong} members have the wrong unread count')
+        print('OK: unread counters match the notifications written')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server that accepts every message and records its recipients"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.recipients = []
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 sink')
+        recipients = []
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO', b'MAIL', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'RCPT':
+                recipients.append(line.decode().split('<', 1)[-1].split('>', 1)[0])
+                self.reply('250 OK')
+            elif command == b'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                with self.server.lock:
+                    self.server.recipients += recipients
+                recipients = []
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+def bench_email(app, args):
+    """Email workers against a local SMTP sink: throughput, and no email sent twice"""
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=sink.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME=None, MAIL_BATCH_SIZE=50)
+    try:
+        for size in args.sizes:
+            with app.app_context():
+                reset_database()
+                bulk_insert(User, [
+                    {'email': f'recipient{i}@bench.local', 'username': f'recipient{i}', 'password_hash': 'x',
+                     'full_name': f'Recipient {i}', 'role': 'single', 'region': 'Greater Accra',
+                     'is_active': True}
+                    for i in range(size)
+                ])
+                user_ids = db.session.scalars(db.select(User.id)).all()
+
+            print(f'\n{size:,} recipients, 2 notifications each')
+            for workers in args.concurrency:
+                with app.app_context():
+                    db.session.execute(db.delete(Notification))
+                    bulk_insert(Notification, [
+                        {'user_id': user_id, 'title': f'Notification {n}', 'message': 'Benchmark',
+                         'notification_type': 'bench', 'read': False, 'email_status': 'pending',
+                         'email_attempts': 0, 'created_at': datetime.utcnow()}
+                        for user_id in user_ids for n in range(2)
+                    ])
+                sink.recipients = []
+
+                threads = [threading.Thread(target=run_email_worker, args=(app,), kwargs={'once': True})
+                           for _ in range(workers)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+
+                with app.app_context():
+                    unsent = db.session.scalar(db.select(db.func.count()).select_from(Notification).where(
+                        Notification.email_status != 'sent'
+                    ))
+                received = len(sink.recipients)
+                duplicates = received - len(set(sink.recipients))
+                print(f"  {f'{workers} worker(s)':<40} {received / elapsed:8.1f} messages/sec   "
+                      f'{received:,} received   {duplicates} duplicates   {unsent} unsent')
+                if duplicates or unsent or received != size:
+                    raise SystemExit(f'FAIL: {received} messages for {size} recipients, '
+                                     f'{duplicates} duplicates, {unsent} unsent')
+        print('OK: every recipient got exactly one email')
+    finally:
+        sink.shutdown()
+        sink.server_close()
+
+
+def bench_auth(app, args):
+    """Per-request authentication overhead with and without the user cache"""
+    with app.app_context():
+        reset_database()
+        create_login_user('bench_single', 'single')
+        seed_singles(args.sizes[0])
+        rebuild_rollups()
+
+    cache = app.extensions['user_cache']
+    ttl = cache.ttl
+    client = login(app, 'bench_single')
+    for label, cache_ttl in [('no cache', 0), ('user cache', ttl)]:
+        cache.ttl = cache_ttl
+        cache.clear()
+        print(f'\n{label}')
+        for path in ['/api/auth/me', '/api/notifications/unread-count']:
+            report(path, *measure(app, client, 'GET', path, repeats=args.repeats))
+    print(f'\nCache stats: {cache.stats()}')
+
+
+def time_calls(func, args_list):
+    """Call func once per args tuple; return (p50 ms, p95 ms)"""
+    timings = []
+    for call_args in args_list:
+        start = time.perf_counter()
+        func(*call_args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), percentile(timings, 95)
+
+
+def bench_lookup(app, args):
+    """Login lookup: OR over username/email vs the login identifier index"""
+    for size in args.sizes:
+        with app.app_context():
+            reset_database()
+            create_login_user('bench_login', 'single')
+            seed_singles(size)
+            rebuild_login_identifiers()
+
+            rng = random.Random(size)
+            names = [f'single{rng.randrange(size)}' for _ in range(args.repeats)]
+            emails = [(f'{name}@bench.local',) for name in names]
+            names = [(name,) for name in names]
+
+            def legacy(identifier):
+                return User.query.filter((User.username == identifier) | (User.email == identifier)).first()
+
+            def legacy_ignoring_case(identifier):
+                identifier = identifier.lower()
+                return User.query.filter(
+                    (db.func.lower(User.username) == identifier) | (db.func.lower(User.email) == identifier)
+                ).first()
+
+            print(f'\n{size:,} users')
+            report('OR username/email (by username)', 1, *time_calls(legacy, names))
+            report('OR username/email (by email)', 1, *time_calls(legacy, emails))
+            report('OR lower(username/email) (by email)', 1, *time_calls(legacy_ignoring_case, emails[:5]))
+            report('identifier (by username)', 1, *time_calls(find_user, names))
+            report('identifier (by email)', 1, *time_calls(find_user, [(e.upper(),) for e, in emails]))
+            report('registration check', 1, *time_calls(taken, [(e, n) for (e,), (n,) in zip(emails, names)]))
+            db.session.remove()
+
+        client = app.test_client()
+        report('POST /api/auth/login', *measure(app, client, 'POST', '/api/auth/login', repeats=args.repeats,
+                                                 json={'username': 'BENCH_LOGIN', 'password': PASSWORD}))
+
+
+def concurrent_logins(app, username, concurrency, repeats):
+    """`concurrency` threads each sign in `repeats` times; return
+    (logins/sec, p50 ms, p95 ms, rejected with 503)"""
+    timings = []
+    rejected = []
+    lock = threading.Lock()
+
+    def run():
+        client = app.test_client()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if response.status_code == 503:
+                    rejected.append(elapsed)
+                elif response.status_code != 200:
+                    raise SystemExit(f'Login failed: {response.status_code} {response.get_data(as_text=True)}')
+                else:
+                    timings.append(elapsed)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(timings) / elapsed, statistics.median(timings), percentile(timings, 95), len(rejected)
+
+
+def bench_login(app, args):
+    """POST /api/auth/login throughput per hashing policy and concurrency"""
+    with app.app_context():
+        reset_database()
+        create_login_user('bench_login', 'single')
+        seed_singles(args.sizes[0])
+
+    configured = app.extensions['password_policy']
+    print(f'Hashing threads per process: {configured.workers}')
+    for method in args.methods or [configured.method]:
+        policy = PasswordPolicy(method, workers=configured.workers, queue=app.config['PASSWORD_HASH_QUEUE'])
+        app.extensions['password_policy'] = policy
+
+        # The first login under a new policy upgrades the stored hash
+        login(app, 'bench_login')
+        with app.app_context():
+            stored = User.query.filter_by(username='bench_login').one().password_hash
+        if policy.needs_rehash(stored):
+            raise SystemExit(f'FAIL: password was not rehashed to {method}')
+
+        print(f"\n{method} (stored as {stored.split('$', 1)[0]})")
+        for concurrency in args.concurrency:
+            throughput, p50, p95, rejected = concurrent_logins(app, 'bench_login', concurrency, args.repeats)
+            print(f'  {concurrency:>3} concurrent   {throughput:8.1f} logins/sec   '
+                  f'p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {rejected} rejected (503)')
+    app.extensions['password_policy'] = configured
+
+
+# Endpoints exercised per gunicorn profile: (label, path, JSON body)
+GUNICORN_ENDPOINTS = [
+    ('GET /api/auth/me', '/api/auth/me', None),
+    ('GET /api/dashboard/stats', '/api/dashboard/stats', None),
+    ('GET /api/dashboard/regional-statistics', '/api/dashboard/regional-statistics', None),
+    ('GET /api/applications/', '/api/applications/?per_page=20', None),
+    ('POST /api/auth/login', '/api/auth/login', {'username': 'bench_central', 'password': PASSWORD}),
+]
+
+
+def http_call(opener, url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with opener.open(request, timeout=120) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def http_client(base_url, username):
+    """An HTTP client with its own cookie jar, signed in as username"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    status = http_call(opener, base_url + '/api/auth/login', {'username': username, 'password': PASSWORD})
+    if status != 200:
+        raise SystemExit(f'Login failed for {username}: {status}')
+    return opener
+
+
+@contextmanager
+def gunicorn_server(profile, workers, port=5099):
+    """Run gunicorn.conf.py with the given profile against the benchmark database"""
+    env = dict(os.environ, GUNICORN_PROFILE=profile, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', "app:create_app('testing')"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if http_call(urllib.request.build_opener(), base_url + '/api/health') == 200:
+                    break
+            except OSError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit(f'gunicorn ({profile}) did not start')
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+@contextmanager
+def open_streams(openers, url):
+    """Hold one notification stream per opener open; yields {status: count}"""
+    statuses = {}
+    responses = []
+    lock = threading.Lock()
+    opened = threading.Barrier(len(openers) + 1)
+
+    def hold(opener):
+        response = None
+        try:
+            response = opener.open(url, timeout=60)
+            status = response.status
+            response.readline()
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = None
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if response is not None:
+                responses.append(response)
+        opened.wait()
+
+    threads = [threading.Thread(target=hold, args=(opener,), daemon=True) for opener in openers]
+    for thread in threads:
+        thread.start()
+    opened.wait()
+    try:
+        yield statuses
+    finally:
+        for response in responses:
+            response.close()
+
+
+def http_load(openers, url, body, duration, on_done=None):
+    """Each opener calls url in a loop for `duration` seconds; return
+    (requests/sec, p50 ms, p95 ms, failed)"""
+    timings = []
+    failed = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def run(opener):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = http_call(opener, url, body)
+            except OSError:
+                status = None
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (timings if status == 200 else failed).append(elapsed)
+
+    threads = [threading.Thread(target=run, args=(opener,)) for opener in openers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if not timings:
+        return 0.0, float('nan'), float('nan'), len(failed)
+    return len(timings) / duration, statistics.median(timings), percentile(timings, 95), len(failed)
+
+
+def bench_gunicorn(app, args):
+    """Throughput of the main endpoints under each gunicorn.conf.py profile"""
+    if app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:'):
+        raise SystemExit('gunicorn needs a database file or server shared with this process')
+    with app.app_context():
+        reset_database()
+        create_login_user('bench_central', 'central_committee')
+        applicant_ids = seed_singles(args.sizes[0])
+        seed_applications(args.sizes[0], applicant_ids)
+        rebuild_rollups()
+        db.session.remove()
+
+    clients = max(args.concurrency)
+    for profile in args.profiles:
+        if profile == 'gevent' and not (importlib.util.find_spec('gevent') and importlib.util.find_spec('psycogreen')):
+            print(f'\n{profile}: skipped (pip install -r requirements-gevent.txt)')
+            continue
+        print(f'\n{profile} ({args.workers} workers, {clients} concurrent clients, {args.duration:g}s each)')
+        with gunicorn_server(profile, args.workers) as base_url:
+            openers = [http_client(base_url, 'bench_central') for _ in range(clients)]
+            for label, path, body in GUNICORN_ENDPOINTS:
+                throughput, p50, p95, failed = http_load(openers, base_url + path, body, args.duration)
+                print(f'  {label:<40} {throughput:8.1f} req/s   p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   '
+                      f'{failed} failed')
+
+            # Cheap requests while a quarter of the clients keep signing in
+            signing_in = max(clients // 4, 1)
+            logins = threading.Thread(target=http_load, args=(
+                openers[:signing_in], base_url + '/api/auth/login', GUNICORN_ENDPOINTS[-1][2], args.duration))
+            logins.start()
+            throughput, p50, p95, failed = http_load(openers[signing_in:] or openers[:1],
+                                                     base_url + '/api/auth/me', None, args.duration)
+            logins.join()
+            print(f"  {'GET /api/auth/me during logins':<40} {throughput:8.1f} req/s   "
+                  f'p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {failed} failed')
+
+            # Cheap requests while browser tabs hold notification streams
+            tabs = [http_client(base_url, 'bench_central') for _ in range(args.streams)]
+            with open_streams(tabs, base_url + '/api/notifications/stream') as statuses:
+                throughput, p50, p95, failed = http_load(openers, base_url + '/api/auth/me', None, args.duration)
+            streams = ', '.join(f'{count} x {status}' for status, count in sorted(statuses.items(), key=str))
+            print(f"  {f'GET /api/auth/me, {args.streams} streams':<40} {throughput:8.1f} req/s   "
+                  f'p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {failed} failed   (streams: {streams})')
+
+
+SCENARIOS = {
+    'auth': bench_auth,
+    'completion': bench_completion,
+    'courtship': bench_courtship,
+    'dashboard': bench_dashboard,
+    'email': bench_email,
+    'explain': bench_explain,
+    'fanout': bench_fanout,
+    'gunicorn': bench_gunicorn,
+    'listing': bench_listing,
+    'login': bench_login,
+    'lookup': bench_lookup,
+    'paging': bench_paging,
+    'provisioning': bench_provisioning,
+    'regional': bench_regional,
+    'search': bench_search,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', choices=sorted(SCENARIOS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="login, gunicorn: simultaneous clients; email: concurrent workers")
+    parser.add_argument('--methods', nargs='+', help='login: PASSWORD_HASH_METHOD values to compare')
+    parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread', 'gevent'],
+                        help='gunicorn: GUNICORN_PROFILE values to compare')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn: worker processes')
+    parser.add_argument('--duration', type=float, default=5.0, help='gunicorn: seconds per endpoint')
+    parser.add_argument('--streams', type=int, default=32, help='gunicorn: notification streams held open')
+    args = parser.parse_args(argv)
+
+    app = create_app('testing')
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    SCENARIOS[args.scenario](app, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,47 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def engine_options(database_url):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS from the DB_* environment variables.
+
+    Connection budget: every process has its own pool, so one web service
+    can open up to WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW + 1)
+    connections. The 1 is the LISTEN connection of the postgres events
+    backend. Each worker service (outbox, email) can open up to
+    DB_POOL_SIZE + DB_MAX_OVERFLOW more. With the defaults (2 web workers,
+    5 + 10 per pool) that is 32 + 2 x 15 = 62. Keep the total below the
+    database's max_connections, leaving room for migrations and psql.
+    """
+    options = {
+        # Test connections before use and replace them before the server
+        # (or a proxy in between) drops them for being idle
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 300),  # seconds
+    }
+    if database_url.startswith('sqlite'):
+        return options
+    
+    # Per process: pool_size kept open, max_overflow more under load,
+    # pool_timeout seconds to wait for one before failing the request
+    options['pool_size'] = int(os.environ.get('DB_POOL_SIZE') or 5)
+    options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    options['pool_timeout'] = float(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    
+    # Milliseconds; 0 (the default) disables. gunicorn.conf.py sets 30000
+    # for the web workers only, so a runaway request query is cancelled
+    # while init_db.py, migrations, rebuild-* commands and the background
+    # workers can run as long as they need
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT') or 0)
+    if database_url.startswith('postgresql'):
+        # TCP keepalives, so a connection dropped while idle (such as the
+        # long-held LISTEN connection in services/events.py) is detected
+        connect_args = {'keepalives': 1, 'keepalives_idle': 30, 'keepalives_interval': 10, 'keepalives_count': 3}
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        options['connect_args'] = connect_args
+    return options
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -31,24 +72,88 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 20
     
+    # Browser cache lifetime of the courtship curriculum (seconds; ETags
+    # still let clients revalidate cheaply after it)
+    CURRICULUM_MAX_AGE = int(os.environ.get('CURRICULUM_MAX_AGE') or 86400)
+    
+    # Per-request query counts and timings (Server-Timing header and a
+    # log line per request; requests over the budget are logged as warnings)
+    REQUEST_INSTRUMENTATION = os.environ.get('REQUEST_INSTRUMENTATION', 'False').lower() == 'true'
+    REQUEST_QUERY_BUDGET = int(os.environ.get('REQUEST_QUERY_BUDGET') or 20)
+    
+    # Bearer token required by /api/metrics. Without one the endpoint is
+    # only served where METRICS_OPEN is set (development and testing)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_OPEN = False
+    
+    # Password hashing: 'pbkdf2:sha256[:iterations]', 'scrypt[:n:r:p]' or,
+    # with argon2-cffi installed, 'argon2[:time_cost:memory_kib:parallelism]'.
+    # Existing hashes are upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)  # hashing threads per process
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE') or 16)  # waiting logins before 503
+    
+    # Per-process cache of logged-in users (seconds; 0 disables)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    
     # Email configuration (optional)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'True').lower() == 'true'
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or MAIL_USERNAME or 'noreply@localhost'
+    MAIL_TIMEOUT = float(os.environ.get('MAIL_TIMEOUT') or 30)
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE') or 50)  # recipients per SMTP connection
+    MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS') or 5)
+    
+    # Outbox worker (notifications are written after the request commits).
+    # Deployments run `flask outbox-worker` as a separate process (Procfile
+    # `worker`); OUTBOX_INLINE_WORKER=true instead polls from a thread in
+    # each web process, which suits a single process such as `flask run`.
+    OUTBOX_INLINE_WORKER = os.environ.get('OUTBOX_INLINE_WORKER', 'False').lower() == 'true'
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL') or 1.0)
+    
+    # Live notification stream (/api/notifications/stream). 'memory' only
+    # reaches clients of the process that wrote the notification, so
+    # PostgreSQL deployments (several workers plus the outbox worker)
+    # default to 'postgres' (LISTEN/NOTIFY). NOTIFICATION_STREAMS=false
+    # (set by the sync gunicorn profile, where a stream would hold a whole
+    # worker) turns the stream off and the frontend polls instead.
+    NOTIFICATION_EVENTS_BACKEND = os.environ.get('NOTIFICATION_EVENTS_BACKEND') or (
+        'postgres' if database_url.startswith('postgresql') else 'memory'
+    )
+    NOTIFICATION_STREAMS = os.environ.get('NOTIFICATION_STREAMS', 'True').lower() == 'true'
+    NOTIFICATION_STREAM_TIMEOUT = int(os.environ.get('NOTIFICATION_STREAM_TIMEOUT') or 300)
+    # Open streams per process before /stream answers 503 (0: no limit;
+    # gunicorn.conf.py sets it from the thread budget)
+    NOTIFICATION_STREAM_LIMIT = int(os.environ.get('NOTIFICATION_STREAM_LIMIT') or 0)
+    NOTIFICATION_STREAM_KEEPALIVE = 25
     
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
+    OUTBOX_INLINE_WORKER = os.environ.get('OUTBOX_INLINE_WORKER', 'True').lower() == 'true'
+    METRICS_OPEN = True
     
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI)
+
+class TestingConfig(Config):
+    """Testing/benchmark configuration (scratch database, plain HTTP cookies)"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    SESSION_COOKIE_SECURE = False
+    OUTBOX_INLINE_WORKER = False
+    METRICS_OPEN = True
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
 
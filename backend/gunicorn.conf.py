@@ -0,0 +1,78 @@
+"""
+Gunicorn settings (loaded automatically from the backend directory)
+GUNICORN_PROFILE picks the worker model:
+
+- 'gthread' (default): WEB_CONCURRENCY processes, each serving
+  GUNICORN_THREADS requests at once. Password hashing and database waits
+  release the GIL, so a slow login or statistics query holds one thread
+  instead of a whole worker. An open notification stream holds a thread
+  for up to NOTIFICATION_STREAM_TIMEOUT, so each worker gets
+  GUNICORN_STREAM_THREADS extra threads for streams and refuses more
+  (503, the browser then polls); the GUNICORN_THREADS API threads stay
+  free. Keep DB_POOL_SIZE + DB_MAX_OVERFLOW at or above GUNICORN_THREADS
+  plus one for the LISTEN connection (streams only borrow one briefly).
+- 'sync': one request per process. Simplest, but every slow request
+  blocks a worker, and a notification stream would hold one for minutes,
+  so streams are turned off (NOTIFICATION_STREAMS=false) and the browser
+  polls the unread count instead.
+- 'gevent': up to GUNICORN_WORKER_CONNECTIONS greenlets per process, for
+  many idle notification streams (three quarters of them at most, so the
+  rest stay for API requests). Needs requirements-gevent.txt; psycopg2
+  is made cooperative with psycogreen and password hashing moves to
+  gevent's pool of real threads (services/passwords.py). The database
+  pool still caps concurrent queries per process.
+
+WEB_CONCURRENCY (worker processes) defaults to a small constant rather
+than the CPU count: inside a container cpu_count() reports the host's
+cores, not the CPU quota. Every worker has its own database pool, so
+workers multiply PostgreSQL connections (see engine_options() in
+config.py for the budget); set WEB_CONCURRENCY to what the instance's
+memory and the database's max_connections allow.
+
+Compare the profiles locally with `python benchmark.py gunicorn`.
+"""
+import os
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = 10
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+# Each worker builds its own app and engine, so no pool connections are
+# shared across fork()
+preload_app = False
+
+# PostgreSQL statement_timeout (ms) for request queries; read by
+# engine_options() in config.py. Only web workers get one by default.
+os.environ.setdefault('DB_STATEMENT_TIMEOUT', '30000')
+
+if profile == 'sync':
+    worker_class = 'sync'
+    os.environ.setdefault('NOTIFICATION_STREAMS', 'false')
+elif profile == 'gthread':
+    worker_class = 'gthread'
+    # Thread budget per worker: API threads that streams can never take,
+    # plus one thread per notification stream allowed
+    api_threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+    stream_threads = int(os.environ.get('GUNICORN_STREAM_THREADS') or 4)
+    threads = api_threads + stream_threads
+    os.environ.setdefault('NOTIFICATION_STREAM_LIMIT', str(stream_threads))
+elif profile == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 200)
+    os.environ.setdefault('NOTIFICATION_STREAM_LIMIT', str(worker_connections * 3 // 4))
+else:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {profile!r} (use 'sync', 'gthread' or 'gevent')")
+
+
+def post_fork(server, worker):
+    if profile == 'gevent':
+        # Wait for PostgreSQL on the gevent hub instead of blocking it
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    server.log.info('Worker %s started (%s profile)', worker.pid, profile)
@@ -3,7 +3,9 @@ Database initialization script
 Creates tables and seeds initial data including admin user
 """
 from app import create_app
+from flask_migrate import upgrade
 from models import db, User
+from services.rollups import rebuild_rollups
 from datetime import datetime
 
 def init_database():
@@ -28,6 +30,11 @@ def init_database():
         db.create_all()
         print("✓ Tables created successfully")
         
+        # Bring existing databases up to date (indexes and later schema
+        # changes that create_all() does not apply to existing tables)
+        upgrade()
+        print("✓ Migrations applied")
+        
         # Check if admin user already exists
         admin = User.query.filter_by(username='admin').first()
         
@@ -102,6 +109,10 @@ def init_database():
         else:
             print("\n✓ Admin user already exists")
         
+        # Recompute rollups so existing data is reflected in the statistics
+        rebuild_rollups()
+        print("✓ Statistics rollups rebuilt")
+        
         print("\n" + "="*50)
         print("Database initialized successfully!")
         print("="*50)
@@ -0,0 +1,100 @@
+"""Add composite indexes matched to hot query predicates
+
+Revision ID: 3f6c1a9d2b41
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+Databases created with db.create_all() (init_db.py) already have these
+indexes, so each one is only created when missing. Duplicated courtship
+weeks are merged into one row first so the unique index can be created.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c1a9d2b41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_users_role_region_active', 'users', ['role', 'region', 'is_active'], False),
+    ('ix_applications_applicant_status', 'applications', ['applicant_id', 'status'], False),
+    ('ix_applications_status_stage', 'applications', ['status', 'current_stage'], False),
+    ('ix_applications_assigned_status', 'applications', ['assigned_committee_member_id', 'status'], False),
+    ('ix_applications_created_at', 'applications', ['created_at'], False),
+    ('ix_notifications_user_read_created', 'notifications', ['user_id', 'read', 'created_at'], False),
+    ('ix_check_ins_status_scheduled', 'check_ins', ['status', 'scheduled_date'], False),
+    ('uq_courtship_progress_application_week', 'courtship_progress', ['application_id', 'week_number'], True),
+]
+
+
+def _existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+# How far a week got; the most-progressed duplicate is the one kept
+STATUS_RANK = {'completed': 2, 'in_progress': 1}
+
+
+def _progress(row):
+    # Then the most recently updated, then the newest row
+    return (STATUS_RANK.get(row.status, 0), row.updated_at is not None, row.updated_at or '', row.id)
+
+
+def _merge_duplicate_progress():
+    """
+    Collapse each duplicated (application, week) pair of courtship_progress
+    into its most-progressed row, keeping the notes and start date another
+    duplicate may hold, and delete the rest
+    """
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        'SELECT p.id, p.application_id, p.week_number, p.status, p.notes, p.last_updated_by, '
+        'p.started_at, p.updated_at FROM courtship_progress p JOIN ('
+        'SELECT application_id, week_number FROM courtship_progress '
+        'GROUP BY application_id, week_number HAVING COUNT(*) > 1'
+        ') d ON d.application_id = p.application_id AND d.week_number = p.week_number'
+    )).all()
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.application_id, row.week_number), []).append(row)
+
+    for group in groups.values():
+        group.sort(key=_progress, reverse=True)
+        keep = group[0]
+        notes, last_updated_by = keep.notes, keep.last_updated_by
+        if not notes:
+            # Notes written on a less-progressed duplicate
+            with_notes = next((row for row in group if row.notes), None)
+            if with_notes:
+                notes, last_updated_by = with_notes.notes, with_notes.last_updated_by
+        started = [row.started_at for row in group if row.started_at is not None]
+        bind.execute(
+            sa.text('UPDATE courtship_progress SET notes = :notes, last_updated_by = :last_updated_by, '
+                    'started_at = :started_at WHERE id = :id'),
+            {'id': keep.id, 'notes': notes, 'last_updated_by': last_updated_by,
+             'started_at': min(started) if started else None}
+        )
+        bind.execute(
+            sa.text('DELETE FROM courtship_progress WHERE id IN :ids').bindparams(sa.bindparam('ids', expanding=True)),
+            {'ids': [row.id for row in group[1:]]}
+        )
+
+
+def upgrade():
+    _merge_duplicate_progress()
+    
+    for name, table, columns, unique in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, columns, unique in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,99 @@
+"""Add application search index
+
+Revision ID: 8b2e4d7f1c55
+Revises: 3f6c1a9d2b41
+Create Date: 2026-10-17 11:00:00.000000
+
+PostgreSQL gets pg_trgm GIN indexes; SQLite gets an FTS5 shadow table
+kept in sync by triggers. Every statement is IF NOT EXISTS because
+db.create_all() already creates these for new databases.
+"""
+import sqlite3
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d7f1c55'
+down_revision = '3f6c1a9d2b41'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS application_search USING fts5("
+    "applicant_name, partner_name, application_number, tokenize='trigram')",
+
+    "CREATE TRIGGER IF NOT EXISTS application_search_ai AFTER INSERT ON applications BEGIN "
+    "INSERT INTO application_search (rowid, applicant_name, partner_name, application_number) "
+    "SELECT NEW.id, (SELECT full_name FROM users WHERE id = NEW.applicant_id), "
+    "NEW.partner_name, NEW.application_number; "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS application_search_au "
+    "AFTER UPDATE OF applicant_id, partner_name, application_number ON applications BEGIN "
+    "DELETE FROM application_search WHERE rowid = OLD.id; "
+    "INSERT INTO application_search (rowid, applicant_name, partner_name, application_number) "
+    "SELECT NEW.id, (SELECT full_name FROM users WHERE id = NEW.applicant_id), "
+    "NEW.partner_name, NEW.application_number; "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS application_search_ad AFTER DELETE ON applications BEGIN "
+    "DELETE FROM application_search WHERE rowid = OLD.id; "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS application_search_user_au AFTER UPDATE OF full_name ON users BEGIN "
+    "DELETE FROM application_search WHERE rowid IN (SELECT id FROM applications WHERE applicant_id = NEW.id); "
+    "INSERT INTO application_search (rowid, applicant_name, partner_name, application_number) "
+    "SELECT id, NEW.full_name, partner_name, application_number FROM applications "
+    "WHERE applicant_id = NEW.id; "
+    "END",
+
+    # Index the rows that existed before the triggers
+    "DELETE FROM application_search",
+    "INSERT INTO application_search (rowid, applicant_name, partner_name, application_number) "
+    "SELECT applications.id, users.full_name, applications.partner_name, applications.application_number "
+    "FROM applications LEFT OUTER JOIN users ON users.id = applications.applicant_id",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS application_search_user_au",
+    "DROP TRIGGER IF EXISTS application_search_ad",
+    "DROP TRIGGER IF EXISTS application_search_au",
+    "DROP TRIGGER IF EXISTS application_search_ai",
+    "DROP TABLE IF EXISTS application_search",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_applications_partner_name_trgm "
+    "ON applications USING gin (partner_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_applications_number_trgm "
+    "ON applications USING gin (application_number gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_applications_number_trgm",
+    "DROP INDEX IF EXISTS ix_applications_partner_name_trgm",
+    "DROP INDEX IF EXISTS ix_users_full_name_trgm",
+]
+
+
+def _statements(sqlite_statements, postgres_statements):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgres_statements
+    # The trigram tokenizer needs SQLite 3.34+; older builds keep ILIKE search
+    if dialect == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0):
+        return sqlite_statements
+    return []
+
+
+def upgrade():
+    for statement in _statements(SQLITE_UPGRADE, POSTGRES_UPGRADE):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in _statements(SQLITE_DOWNGRADE, POSTGRES_DOWNGRADE):
+        op.execute(statement)
@@ -0,0 +1,34 @@
+"""Add an index on check_ins.application_id
+
+Revision ID: a4c7e9b2d815
+Revises: f2c6a8e1d304
+Create Date: 2026-10-17 21:00:00.000000
+
+The courtship progress summary and the check-in list filter check-ins by
+application. Databases created with db.create_all() already have the
+index, so it is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e9b2d815'
+down_revision = 'f2c6a8e1d304'
+branch_labels = None
+depends_on = None
+
+
+def _has_index():
+    inspector = sa.inspect(op.get_bind())
+    return 'ix_check_ins_application_id' in {index['name'] for index in inspector.get_indexes('check_ins')}
+
+
+def upgrade():
+    if not _has_index():
+        op.create_index('ix_check_ins_application_id', 'check_ins', ['application_id'], unique=False)
+
+
+def downgrade():
+    if _has_index():
+        op.drop_index('ix_check_ins_application_id', table_name='check_ins')
@@ -0,0 +1,104 @@
+"""Add application_rollups and user_rollups
+
+Revision ID: b8e3f1a6c920
+Revises: a4c7e9b2d815
+Create Date: 2026-10-17 22:00:00.000000
+
+The rollups are derived data, so tables from an older db.create_all()
+without group_key are dropped and recreated; then both are filled from
+users and applications, as `flask rebuild-rollups` does.
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f1a6c920'
+down_revision = 'a4c7e9b2d815'
+branch_labels = None
+depends_on = None
+
+
+# (column, type) in key order; the boolean is normalized like
+# services/rollups.py does so group_key comes out identical
+APPLICATION_KEY = [
+    ('region', sa.String(length=100)),
+    ('applicant_role', sa.String(length=30)),
+    ('applicant_active', sa.Boolean()),
+    ('status', sa.String(length=30)),
+    ('current_stage', sa.String(length=100)),
+]
+USER_KEY = [
+    ('region', sa.String(length=100)),
+    ('division', sa.String(length=100)),
+    ('gender', sa.String(length=10)),
+    ('role', sa.String(length=30)),
+    ('is_active', sa.Boolean()),
+]
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if table not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _create(table, key):
+    existing = _columns(table)
+    if existing is not None and 'group_key' in existing:
+        return
+    if existing is not None:
+        op.drop_table(table)
+    op.create_table(
+        table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('group_key', sa.String(length=400), nullable=False),
+        *[sa.Column(name, type_, nullable=True) for name, type_ in key],
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(f'ix_{table}_region', table, ['region'], unique=False)
+    op.create_index(f'uq_{table}_group_key', table, ['group_key'], unique=True)
+
+
+def _fill(table, key, rows):
+    """Replace the table's rows with one per grouped (key..., count) row"""
+    names = [name for name, _ in key]
+    target = sa.table(table, sa.column('group_key'), sa.column('count'), *[sa.column(name) for name in names])
+    values = []
+    for row in rows:
+        group = [
+            None if value is None else bool(value) if isinstance(type_, sa.Boolean) else value
+            for value, (_, type_) in zip(row[:-1], key)
+        ]
+        value = dict(zip(names, group))
+        value['group_key'] = json.dumps(group, separators=(',', ':'))
+        value['count'] = row[-1]
+        values.append(value)
+    op.execute(sa.delete(target))
+    if values:
+        op.bulk_insert(target, values)
+
+
+def upgrade():
+    _create('application_rollups', APPLICATION_KEY)
+    _create('user_rollups', USER_KEY)
+
+    bind = op.get_bind()
+    _fill('application_rollups', APPLICATION_KEY, bind.execute(sa.text(
+        'SELECT users.region, users.role, users.is_active, applications.status, applications.current_stage, '
+        'COUNT(applications.id) FROM applications LEFT OUTER JOIN users ON applications.applicant_id = users.id '
+        'GROUP BY users.region, users.role, users.is_active, applications.status, applications.current_stage'
+    )).all())
+    _fill('user_rollups', USER_KEY, bind.execute(sa.text(
+        'SELECT region, division, gender, role, is_active, COUNT(id) FROM users '
+        'GROUP BY region, division, gender, role, is_active'
+    )).all())
+
+
+def downgrade():
+    for table in ('user_rollups', 'application_rollups'):
+        if _columns(table) is not None:
+            op.drop_table(table)
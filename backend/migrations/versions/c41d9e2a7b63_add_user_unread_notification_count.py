@@ -0,0 +1,42 @@
+"""Add users.unread_notification_count
+
+Revision ID: c41d9e2a7b63
+Revises: 8b2e4d7f1c55
+Create Date: 2026-10-17 13:00:00.000000
+
+Databases created with db.create_all() already have the column, so it
+is only added when missing; the backfill runs either way.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d9e2a7b63'
+down_revision = '8b2e4d7f1c55'
+branch_labels = None
+depends_on = None
+
+
+def _has_column():
+    inspector = sa.inspect(op.get_bind())
+    return 'unread_notification_count' in {column['name'] for column in inspector.get_columns('users')}
+
+
+def upgrade():
+    if not _has_column():
+        op.add_column('users', sa.Column('unread_notification_count', sa.Integer(),
+                                         nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE users SET unread_notification_count = ('
+        'SELECT COUNT(notifications.id) FROM notifications '
+        'WHERE notifications.user_id = users.id AND notifications.read IS false)'
+    )
+
+
+def downgrade():
+    # Plain ALTER rather than a batch table rebuild, which on SQLite would
+    # also drop the search index trigger on users
+    if _has_column():
+        op.execute('ALTER TABLE users DROP COLUMN unread_notification_count')
@@ -0,0 +1,44 @@
+"""Add email claim columns to notifications
+
+Revision ID: c9d2f7a4e136
+Revises: b8e3f1a6c920
+Create Date: 2026-10-17 23:00:00.000000
+
+Email workers claim a recipient's pending emails (email_status='sending')
+before sending them, so two workers never send the same notification.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d2f7a4e136'
+down_revision = 'b8e3f1a6c920'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('email_claimed_by', sa.String(length=64), nullable=True),
+    sa.Column('email_claimed_at', sa.DateTime(), nullable=True),
+]
+
+
+def _existing():
+    inspector = sa.inspect(op.get_bind())
+    return {column['name'] for column in inspector.get_columns('notifications')}
+
+
+def upgrade():
+    columns = _existing()
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column('notifications', column)
+
+
+def downgrade():
+    columns = _existing()
+    # Plain ALTER rather than a batch table rebuild (see c41d9e2a7b63)
+    for column in reversed(COLUMNS):
+        if column.name in columns:
+            op.execute(f'ALTER TABLE notifications DROP COLUMN {column.name}')
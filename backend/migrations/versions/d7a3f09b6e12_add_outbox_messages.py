@@ -0,0 +1,50 @@
+"""Add outbox_messages
+
+Revision ID: d7a3f09b6e12
+Revises: c41d9e2a7b63
+Create Date: 2026-10-17 15:00:00.000000
+
+Databases created with db.create_all() already have the table, so it is
+only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f09b6e12'
+down_revision = 'c41d9e2a7b63'
+branch_labels = None
+depends_on = None
+
+
+def _has_table():
+    return 'outbox_messages' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if _has_table():
+        return
+    op.create_table(
+        'outbox_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('claimed_by', sa.String(length=64), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_messages_status_available', 'outbox_messages',
+                    ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    if _has_table():
+        op.drop_index('ix_outbox_messages_status_available', table_name='outbox_messages')
+        op.drop_table('outbox_messages')
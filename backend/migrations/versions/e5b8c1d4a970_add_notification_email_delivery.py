@@ -0,0 +1,54 @@
+"""Add notification email delivery columns
+
+Revision ID: e5b8c1d4a970
+Revises: d7a3f09b6e12
+Create Date: 2026-10-17 17:00:00.000000
+
+Databases created with db.create_all() already have these, so each
+column and the index are only added when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c1d4a970'
+down_revision = 'd7a3f09b6e12'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('email_status', sa.String(length=20), nullable=True),
+    sa.Column('email_attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('email_next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('emailed_at', sa.DateTime(), nullable=True),
+]
+
+INDEX = 'ix_notifications_email_status_next'
+
+
+def _existing():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('notifications')}
+    indexes = {index['name'] for index in inspector.get_indexes('notifications')}
+    return columns, indexes
+
+
+def upgrade():
+    columns, indexes = _existing()
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column('notifications', column)
+    if INDEX not in indexes:
+        op.create_index(INDEX, 'notifications', ['email_status', 'email_next_attempt_at'], unique=False)
+
+
+def downgrade():
+    columns, indexes = _existing()
+    if INDEX in indexes:
+        op.drop_index(INDEX, table_name='notifications')
+    # Plain ALTER rather than a batch table rebuild (see c41d9e2a7b63)
+    for column in reversed(COLUMNS):
+        if column.name in columns:
+            op.execute(f'ALTER TABLE notifications DROP COLUMN {column.name}')
@@ -0,0 +1,61 @@
+"""Add login_identifiers
+
+Revision ID: f2c6a8e1d304
+Revises: e5b8c1d4a970
+Create Date: 2026-10-17 19:00:00.000000
+
+Databases created with db.create_all() already have the table, so it is
+only created when missing; the backfill runs either way. Usernames and
+emails that clash with an older account ignoring case are skipped (see
+`flask rebuild-login-identifiers`).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8e1d304'
+down_revision = 'e5b8c1d4a970'
+branch_labels = None
+depends_on = None
+
+
+def _has_table():
+    return 'login_identifiers' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table():
+        op.create_table(
+            'login_identifiers',
+            sa.Column('identifier', sa.String(length=120), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=10), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('identifier')
+        )
+        op.create_index('ix_login_identifiers_user_id', 'login_identifiers', ['user_id'], unique=False)
+
+    # str.lower() like services/login_identifiers.normalize(): SQL lower()
+    # only folds ASCII in SQLite, and login looks identifiers up with the
+    # Python one. Oldest users first so the oldest account wins a clash.
+    bind = op.get_bind()
+    rows = []
+    for user_id, username, email in bind.execute(sa.text('SELECT id, username, email FROM users ORDER BY id')):
+        identifiers = set()
+        for kind, value in (('username', username), ('email', email)):
+            identifier = (value or '').lower()
+            if identifier and identifier not in identifiers:
+                identifiers.add(identifier)
+                rows.append({'identifier': identifier, 'user_id': user_id, 'kind': kind})
+    if rows:
+        bind.execute(sa.text(
+            'INSERT INTO login_identifiers (identifier, user_id, kind) '
+            'VALUES (:identifier, :user_id, :kind) ON CONFLICT DO NOTHING'
+        ), rows)
+
+
+def downgrade():
+    if _has_table():
+        op.drop_index('ix_login_identifiers_user_id', table_name='login_identifiers')
+        op.drop_table('login_identifiers')
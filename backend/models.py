@@ -1,13 +1,16 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.passwords import hash_password, verify_password, needs_rehash
 
 db = SQLAlchemy()
 
 class User(UserMixin, db.Model):
     """User model for authentication"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_role_region_active', 'role', 'region', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
@@ -16,30 +19,41 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(150), nullable=False)
     phone = db.Column(db.String(20))
     
+    # Role, location, gender and status group the user and application
+    # rollups; active_history loads the old value on change, even when the
+    # attribute was expired, so services/rollups.py can move the count
+    
     # Role: 'single', 'committee_member', 'central_committee', 'overseer'
-    role = db.Column(db.String(30), nullable=False, default='single')
+    role = db.column_property(db.Column(db.String(30), nullable=False, default='single'), active_history=True)
     
     # Location information
-    region = db.Column(db.String(100))  # e.g., Greater Accra, Ashanti
-    division = db.Column(db.String(100))  # e.g., Accra Central, Kumasi East
+    region = db.column_property(db.Column(db.String(100)), active_history=True)  # e.g., Greater Accra, Ashanti
+    division = db.column_property(db.Column(db.String(100)), active_history=True)  # e.g., Accra Central, Kumasi East
     local_church = db.Column(db.String(150))
     
     # Gender
-    gender = db.Column(db.String(10))  # 'male' or 'female'
+    gender = db.column_property(db.Column(db.String(10)), active_history=True)  # 'male' or 'female'
     
     # Status
-    is_active = db.Column(db.Boolean, default=True)
+    is_active = db.column_property(db.Column(db.Boolean, default=True), active_history=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Denormalized count of unread notifications (see services/notifications.py)
+    unread_notification_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationships
     applications = db.relationship('Application', backref='applicant', lazy=True, foreign_keys='Application.applicant_id')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash predates the current PASSWORD_HASH_METHOD"""
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -61,6 +75,12 @@ class User(UserMixin, db.Model):
 class Application(db.Model):
     """Marriage application model"""
     __tablename__ = 'applications'
+    __table_args__ = (
+        db.Index('ix_applications_applicant_status', 'applicant_id', 'status'),
+        db.Index('ix_applications_status_stage', 'status', 'current_stage'),
+        db.Index('ix_applications_assigned_status', 'assigned_committee_member_id', 'status'),
+        db.Index('ix_applications_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     application_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -96,9 +116,14 @@ class Application(db.Model):
     knows_partner = db.Column(db.Boolean)
     relationship_description = db.Column(db.Text)
     
-    # Current stage
-    current_stage = db.Column(db.String(100), nullable=False, default='application_submitted')
-    status = db.Column(db.String(30), nullable=False, default='pending')  # pending, approved, rejected, on_hold
+    # Current stage and status (active_history: the rollups need the old
+    # values, see User)
+    current_stage = db.column_property(
+        db.Column(db.String(100), nullable=False, default='application_submitted'), active_history=True
+    )
+    status = db.column_property(
+        db.Column(db.String(30), nullable=False, default='pending'), active_history=True
+    )  # pending, approved, rejected, on_hold
     
     # Committee assignment
     assigned_committee_member_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -279,9 +304,12 @@ class Meeting(db.Model):
 class CheckIn(db.Model):
     """Monthly check-ins during courtship"""
     __tablename__ = 'check_ins'
+    __table_args__ = (
+        db.Index('ix_check_ins_status_scheduled', 'status', 'scheduled_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False, index=True)
     
     scheduled_date = db.Column(db.DateTime, nullable=False)
     completed_date = db.Column(db.DateTime)
@@ -479,6 +507,10 @@ class Complaint(db.Model):
 class Notification(db.Model):
     """Notification system"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_read_created', 'user_id', 'read', 'created_at'),
+        db.Index('ix_notifications_email_status_next', 'email_status', 'email_next_attempt_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -491,6 +523,15 @@ class Notification(db.Model):
     read = db.Column(db.Boolean, default=False)
     read_at = db.Column(db.DateTime)
     
+    # Email copy: None (not emailed), 'pending', 'sending', 'sent', 'failed'
+    email_status = db.Column(db.String(20))
+    email_attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    email_next_attempt_at = db.Column(db.DateTime)
+    emailed_at = db.Column(db.DateTime)
+    # Email worker that claimed the email and when
+    email_claimed_by = db.Column(db.String(64))
+    email_claimed_at = db.Column(db.DateTime)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref='notifications')
@@ -509,6 +550,10 @@ class Notification(db.Model):
 class CourtshipProgress(db.Model):
     """Track courtship topic progression for couples"""
     __tablename__ = 'courtship_progress'
+    __table_args__ = (
+        # One row per couple per week
+        db.Index('uq_courtship_progress_application_week', 'application_id', 'week_number', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False)
@@ -558,3 +603,89 @@ class CourtshipProgress(db.Model):
         
         return data
 
+
+
+class ApplicationRollup(db.Model):
+    """Materialized application counts per region, applicant role/state, status and stage"""
+    __tablename__ = 'application_rollups'
+    __table_args__ = (
+        db.Index('uq_application_rollups_group_key', 'group_key', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # The grouping columns below encoded as one value (services/rollups.py),
+    # so rows with NULLs in the key are unique too
+    group_key = db.Column(db.String(400), nullable=False)
+    
+    # Applicant's region, role and active flag at the time of counting
+    region = db.Column(db.String(100), index=True)
+    applicant_role = db.Column(db.String(30))
+    applicant_active = db.Column(db.Boolean)
+    
+    status = db.Column(db.String(30))
+    current_stage = db.Column(db.String(100))
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class UserRollup(db.Model):
+    """Materialized user counts per region, division, gender, role and active flag"""
+    __tablename__ = 'user_rollups'
+    __table_args__ = (
+        db.Index('uq_user_rollups_group_key', 'group_key', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # The grouping columns below encoded as one value
+    group_key = db.Column(db.String(400), nullable=False)
+    
+    region = db.Column(db.String(100), index=True)
+    division = db.Column(db.String(100))
+    gender = db.Column(db.String(10))
+    role = db.Column(db.String(30))
+    is_active = db.Column(db.Boolean)
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class LoginIdentifier(db.Model):
+    """A lower-cased username or email a user signs in with (see services/login_identifiers.py)"""
+    __tablename__ = 'login_identifiers'
+    
+    # The primary key makes usernames and emails unique ignoring case
+    identifier = db.Column(db.String(120), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    # Kind: 'username' or 'email'
+    kind = db.Column(db.String(10), nullable=False)
+
+
+class OutboxMessage(db.Model):
+    """Transactional outbox: side effects queued with the change that caused them"""
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        db.Index('ix_outbox_messages_status_available', 'status', 'available_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Handler name (e.g. 'notification') and its JSON arguments
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    
+    # Status: 'pending', 'processing', 'done', 'failed'
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    
+    # Not picked up before this time (retry backoff)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Worker that claimed the message and when
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
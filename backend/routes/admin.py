@@ -3,6 +3,12 @@ from flask_login import login_required, current_user
 from models import db, User
 from datetime import datetime
 from functools import wraps
+from services.pagination import keyset_paginate, InvalidCursor
+from services.rollups import user_rollup_rows
+from services.user_cache import user_cache
+from services.passwords import password_policy
+from services.pool_metrics import pool_stats
+from services import login_identifiers
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -38,6 +44,31 @@ def get_users():
     if role_filter:
         query = query.filter_by(role=role_filter)
     
+    # Cursor mode: keyset pagination on the same sort keys, no total count.
+    # Region is nullable, so it is compared through coalesce().
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = keyset_paginate(
+                query,
+                [
+                    (db.func.coalesce(User.region, ''), False),
+                    (User.role, False),
+                    (User.full_name, False),
+                    (User.id, False)
+                ],
+                cursor=cursor,
+                per_page=per_page
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'users': [user.to_dict() for user in items],
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }), 200
+    
     # Order by region, then role, then name
     query = query.order_by(User.region, User.role, User.full_name)
     
@@ -100,11 +131,12 @@ def create_user():
     if current_user.role == 'committee_member' and data['region'] != current_user.region:
         return jsonify({'error': 'You can only create users in your region'}), 403
     
-    # Check if user already exists
-    if User.query.filter_by(email=data['email']).first():
+    # Check if user already exists (ignoring case)
+    existing = login_identifiers.taken(data['email'], data['username'])
+    if 'email' in existing:
         return jsonify({'error': 'Email already registered'}), 400
     
-    if User.query.filter_by(username=data['username']).first():
+    if 'username' in existing:
         return jsonify({'error': 'Username already taken'}), 400
     
     # Validate role - committee members can't create central committee or overseers
@@ -236,24 +268,20 @@ def delete_user(user_id):
 def get_admin_stats():
     """Get admin statistics"""
     
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    
-    # Users by role
-    users_by_role = db.session.query(
-        User.role,
-        db.func.count(User.id)
-    ).group_by(User.role).all()
-    
-    role_counts = {role: count for role, count in users_by_role}
-    
-    # Users by region
-    users_by_region = db.session.query(
-        User.region,
-        db.func.count(User.id)
-    ).group_by(User.region).all()
-    
-    region_counts = {region: count for region, count in users_by_region if region}
+    # Counts come from the user rollups rather than scanning users
+    total_users = 0
+    active_users = 0
+    role_counts = {}
+    region_counts = {}
+    for role, region, is_active, count in user_rollup_rows('role', 'region', 'is_active'):
+        if not count:
+            continue
+        total_users += count
+        if is_active:
+            active_users += count
+        role_counts[role] = role_counts.get(role, 0) + count
+        if region:
+            region_counts[region] = region_counts.get(region, 0) + count
     
     return jsonify({
         'total_users': total_users,
@@ -262,3 +290,16 @@ def get_admin_stats():
         'by_region': region_counts
     }), 200
 
+
+@admin_bp.route('/diagnostics', methods=['GET'])
+@login_required
+def get_diagnostics():
+    """Runtime counters for this process (central committee only)"""
+    if current_user.role != 'central_committee':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'user_cache': user_cache().stats(),
+        'password_policy': password_policy().stats(),
+        'database_pool': pool_stats()
+    }), 200
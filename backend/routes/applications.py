@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Application, StageHistory, User, Notification
+from models import db, Application, StageHistory, User
 from datetime import datetime
+from services.loaders import application_list_options
+from services.pagination import keyset_paginate, InvalidCursor
+from services.notifications import queue_notification, queue_notifications
+from services.search import search_matches
 import random
 import string
 
@@ -14,18 +18,6 @@ def generate_application_number():
     return f"DLBC-{year}-{random_str}"
 
 
-def create_notification(user_id, title, message, notification_type, application_id=None):
-    """Create a notification for a user"""
-    notification = Notification(
-        user_id=user_id,
-        application_id=application_id,
-        title=title,
-        message=message,
-        notification_type=notification_type
-    )
-    db.session.add(notification)
-
-
 @applications_bp.route('/', methods=['POST'])
 @login_required
 def create_application():
@@ -99,20 +91,15 @@ def create_application():
         db.session.add(next_stage)
         
         # Notify committee members in the same region
-        committee_members = User.query.filter_by(
-            role='committee_member',
-            region=current_user.region,
-            is_active=True
-        ).all()
-        
-        for member in committee_members:
-            create_notification(
-                member.id,
-                'New Marriage Application',
-                f'{current_user.full_name} has submitted a marriage application',
-                'new_application',
-                application.id
-            )
+        # Flush so the notifications can reference the new application's id
+        db.session.flush()
+        queue_notifications(
+            {'role': 'committee_member', 'region': current_user.region, 'is_active': True},
+            'New Marriage Application',
+            f'{current_user.full_name} has submitted a marriage application',
+            'new_application',
+            application.id
+        )
         
         db.session.commit()
         
@@ -158,20 +145,41 @@ def get_applications():
     
     # Search functionality (only for committee members and above)
     search = request.args.get('search')
+    matches = None
     if search and current_user.role != 'single':
-        # Join with User table if not already joined
-        if current_user.role in ['central_committee', 'overseer']:
-            query = query.join(User, Application.applicant_id == User.id)
-        
         # Search by applicant name, partner name, or application number
-        search_filter = db.or_(
-            User.full_name.ilike(f'%{search}%'),
-            Application.partner_name.ilike(f'%{search}%'),
-            Application.application_number.ilike(f'%{search}%')
-        )
-        query = query.filter(search_filter)
+        # through the search index, best matches first
+        matches = search_matches(search)
+        query = query.join(matches, matches.c.application_id == Application.id)
+    
+    # Load applicants with the page instead of one SELECT per row
+    query = query.options(*application_list_options())
+    
+    # Cursor mode: keyset pagination on (created_at, id), no total count
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            keys = [(Application.created_at, True), (Application.id, True)]
+            if matches is not None:
+                keys.insert(0, (matches.c.rank, True))
+            items, next_cursor = keyset_paginate(
+                query,
+                keys,
+                cursor=cursor,
+                per_page=per_page
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'applications': [app.to_dict() for app in items],
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }), 200
     
-    # Order by most recent
+    # Order by best match when searching, then most recent
+    if matches is not None:
+        query = query.order_by(matches.c.rank.desc())
     query = query.order_by(Application.created_at.desc())
     
     # Paginate
@@ -311,7 +319,7 @@ def update_stage(application_id):
         application.current_stage = data['next_stage']
     
     # Notify applicant
-    create_notification(
+    queue_notification(
         application.applicant_id,
         'Application Stage Update',
         f'Your application has been updated: {current_stage.stage_name}',
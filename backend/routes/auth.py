@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
+from services import login_identifiers
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -16,11 +17,12 @@ def register():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
-    # Check if user already exists
-    if User.query.filter_by(email=data['email']).first():
+    # Check if user already exists (ignoring case)
+    existing = login_identifiers.taken(data['email'], data['username'])
+    if 'email' in existing:
         return jsonify({'error': 'Email already registered'}), 400
     
-    if User.query.filter_by(username=data['username']).first():
+    if 'username' in existing:
         return jsonify({'error': 'Username already taken'}), 400
     
     # Create new user
@@ -62,9 +64,7 @@ def login():
         return jsonify({'error': 'Username and password required'}), 400
     
     # Find user by username or email
-    user = User.query.filter(
-        (User.username == data['username']) | (User.email == data['username'])
-    ).first()
+    user = login_identifiers.find_user(data['username'])
     
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
@@ -72,6 +72,11 @@ def login():
     if not user.is_active:
         return jsonify({'error': 'Account is inactive'}), 403
     
+    # Upgrade the stored hash if the hashing policy has changed
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
     # Log the user in
     login_user(user, remember=data.get('remember', False))
     
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Application, User, StageHistory, Notification
+from models import db, Application, User, StageHistory
 from datetime import datetime
+from services.loaders import application_list_options
+from services.notifications import queue_notification
+from services.rollups import application_rollup_rows
 
 committee_bp = Blueprint('committee', __name__)
 
@@ -20,7 +23,9 @@ def get_pending_applications():
             User.region == current_user.region
         )
     
-    applications = query.order_by(Application.created_at.desc()).all()
+    applications = query.order_by(Application.created_at.desc()).options(
+        *application_list_options()
+    ).all()
     
     return jsonify({
         'applications': [app.to_dict() for app in applications]
@@ -52,14 +57,13 @@ def assign_application(application_id):
     application.updated_at = datetime.utcnow()
     
     # Create notification
-    notification = Notification(
-        user_id=member_id,
-        application_id=application_id,
-        title='Application Assigned',
-        message=f'You have been assigned application {application.application_number}',
-        notification_type='assignment'
+    queue_notification(
+        member_id,
+        'Application Assigned',
+        f'You have been assigned application {application.application_number}',
+        'assignment',
+        application_id
     )
-    db.session.add(notification)
     
     try:
         db.session.commit()
@@ -125,26 +129,24 @@ def record_interview(application_id):
         db.session.add(medical_stage)
         
         # Notify applicant
-        notification = Notification(
-            user_id=application.applicant_id,
-            application_id=application_id,
-            title='Interview Completed',
-            message='Your interview has been completed. Please proceed with medical tests.',
-            notification_type='stage_update'
+        queue_notification(
+            application.applicant_id,
+            'Interview Completed',
+            'Your interview has been completed. Please proceed with medical tests.',
+            'stage_update',
+            application_id
         )
-        db.session.add(notification)
     else:
         application.status = 'rejected'
         
         # Notify applicant
-        notification = Notification(
-            user_id=application.applicant_id,
-            application_id=application_id,
-            title='Application Update',
-            message='Your application requires additional review.',
-            notification_type='stage_update'
+        queue_notification(
+            application.applicant_id,
+            'Application Update',
+            'Your application requires additional review.',
+            'stage_update',
+            application_id
         )
-        db.session.add(notification)
     
     try:
         db.session.commit()
@@ -187,30 +189,24 @@ def get_statistics():
     if current_user.role not in ['committee_member', 'central_committee', 'overseer']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    query = Application.query
+    # Counts come from the application rollups: status totals are scoped to
+    # the member's region, stage totals cover all applications
+    scoped = current_user.role == 'committee_member'
     
-    # Filter by region for committee members
-    if current_user.role == 'committee_member':
-        query = query.join(User, Application.applicant_id == User.id).filter(
-            User.region == current_user.region
-        )
-    
-    total_applications = query.count()
-    pending_applications = query.filter_by(status='pending').count()
-    approved_applications = query.filter_by(status='approved').count()
-    rejected_applications = query.filter_by(status='rejected').count()
-    
-    # Applications by stage
-    stages = db.session.query(
-        Application.current_stage,
-        db.func.count(Application.id)
-    ).group_by(Application.current_stage).all()
+    totals = {}
+    stages = {}
+    for region, status, stage, count in application_rollup_rows('region', 'status', 'current_stage'):
+        if not count:
+            continue
+        stages[stage] = stages.get(stage, 0) + count
+        if scoped and region != current_user.region:
+            continue
+        totals[status] = totals.get(status, 0) + count
     
     return jsonify({
-        'total': total_applications,
-        'pending': pending_applications,
-        'approved': approved_applications,
-        'rejected': rejected_applications,
-        'by_stage': {stage: count for stage, count in stages}
+        'total': sum(totals.values()),
+        'pending': totals.get('pending', 0),
+        'approved': totals.get('approved', 0),
+        'rejected': totals.get('rejected', 0),
+        'by_stage': stages
     }), 200
-
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Complaint, Notification, User
+from models import db, Complaint
 from datetime import datetime
+from services.notifications import queue_notification, queue_notifications
 
 complaints_bp = Blueprint('complaints', __name__)
 
@@ -49,24 +50,20 @@ def notify_personnel(complaint):
     """Notify the appropriate personnel about the complaint"""
     # Determine who to notify based on send_to field
     if complaint.send_to == 'central_committee':
-        users = User.query.filter_by(role='central_committee', is_active=True).all()
-    elif complaint.send_to == 'regional_pastor':
-        users = User.query.filter_by(role='overseer', is_active=True).all()
-    elif complaint.send_to == 'national_overseer':
-        users = User.query.filter_by(role='overseer', is_active=True).all()
+        role = 'central_committee'
+    elif complaint.send_to in ['regional_pastor', 'national_overseer']:
+        role = 'overseer'
     else:
-        users = []
+        return
     
     # Create notifications
-    for user in users:
-        notification = Notification(
-            user_id=user.id,
-            title=f'New {complaint.complaint_type.replace("_", " ").title()} Complaint',
-            message=f'Subject: {complaint.subject}',
-            notification_type='complaint',
-            application_id=complaint.application_id
-        )
-        db.session.add(notification)
+    queue_notifications(
+        {'role': role, 'is_active': True},
+        f'New {complaint.complaint_type.replace("_", " ").title()} Complaint',
+        f'Subject: {complaint.subject}',
+        'complaint',
+        complaint.application_id
+    )
     
     db.session.commit()
 
@@ -161,14 +158,13 @@ def update_complaint(complaint_id):
             
             # Notify the submitter if not anonymous
             if complaint.submitted_by_id:
-                notification = Notification(
-                    user_id=complaint.submitted_by_id,
-                    title='Complaint Update',
-                    message=f'Your complaint "{complaint.subject}" has been {data["status"]}',
-                    notification_type='complaint_update',
-                    application_id=complaint.application_id
+                queue_notification(
+                    complaint.submitted_by_id,
+                    'Complaint Update',
+                    f'Your complaint "{complaint.subject}" has been {data["status"]}',
+                    'complaint_update',
+                    complaint.application_id
                 )
-                db.session.add(notification)
     
     complaint.updated_at = datetime.utcnow()
     
@@ -1,43 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Application, CourtshipProgress, CheckIn, Notification
-from datetime import datetime, timedelta
+from models import db, Application, CourtshipProgress, CheckIn
+from datetime import datetime
+from services.courtship import start_courtships, eligible_applications, courtship_summary
 
 courtship_bp = Blueprint('courtship', __name__)
 
-# 24 Courtship Topics
-COURTSHIP_TOPICS = [
-    {"week": 1, "title": "Biblical Foundation of Marriage", "description": "Understanding God's design for marriage from Genesis to Revelation"},
-    {"week": 2, "title": "Roles and Responsibilities", "description": "Understanding the husband's and wife's biblical roles"},
-    {"week": 3, "title": "Communication in Marriage", "description": "Effective communication skills for couples"},
-    {"week": 4, "title": "Conflict Resolution", "description": "Biblical approaches to resolving disagreements"},
-    {"week": 5, "title": "Financial Management", "description": "Biblical principles of money management in marriage"},
-    {"week": 6, "title": "Intimacy and Purity", "description": "Understanding physical intimacy in marriage"},
-    {"week": 7, "title": "Spiritual Leadership", "description": "Leading your family spiritually"},
-    {"week": 8, "title": "Prayer and Devotion", "description": "Building a prayer life as a couple"},
-    {"week": 9, "title": "Family Planning", "description": "Biblical perspective on children and family size"},
-    {"week": 10, "title": "In-Laws and Extended Family", "description": "Navigating relationships with extended family"},
-    {"week": 11, "title": "Building Trust", "description": "Foundation of trust in marriage"},
-    {"week": 12, "title": "Forgiveness and Grace", "description": "Practicing forgiveness in marriage"},
-    {"week": 13, "title": "Submission and Love", "description": "Understanding Ephesians 5:22-33"},
-    {"week": 14, "title": "Handling Stress Together", "description": "Managing life's pressures as a team"},
-    {"week": 15, "title": "Career and Marriage Balance", "description": "Balancing work and family life"},
-    {"week": 16, "title": "Sexual Intimacy", "description": "God's design for sexual relationship in marriage"},
-    {"week": 17, "title": "Dealing with Infertility", "description": "Trusting God through fertility challenges"},
-    {"week": 18, "title": "Parenting Preparation", "description": "Preparing to raise godly children"},
-    {"week": 19, "title": "Time Management", "description": "Prioritizing and managing time together"},
-    {"week": 20, "title": "Cultural Differences", "description": "Respecting and bridging cultural gaps"},
-    {"week": 21, "title": "Maintaining Romance", "description": "Keeping the spark alive in marriage"},
-    {"week": 22, "title": "Long-term Vision", "description": "Setting goals and vision for your family"},
-    {"week": 23, "title": "Marriage in Ministry", "description": "Serving God together as a couple"},
-    {"week": 24, "title": "Wedding Preparation", "description": "Practical preparation for the wedding day"}
-]
+# Most applications a committee can start in one batch request
+MAX_BULK_APPLICATIONS = 500
 
 
 @courtship_bp.route('/applications/<int:application_id>/initialize', methods=['POST'])
 @login_required
 def initialize_courtship(application_id):
-    """Initialize courtship period with 24 topics"""
+    """Initialize the courtship period: the weekly topics and monthly check-ins"""
     application = Application.query.get(application_id)
     
     if not application:
@@ -48,58 +24,58 @@ def initialize_courtship(application_id):
         if application.applicant_id != current_user.id:
             return jsonify({'error': 'Unauthorized'}), 403
     
-    # Check if already initialized
-    existing = CourtshipProgress.query.filter_by(application_id=application_id).first()
-    if existing:
-        return jsonify({'error': 'Courtship already initialized'}), 400
-    
-    # Create 24 weekly topics
-    progress_items = []
-    for topic in COURTSHIP_TOPICS:
-        progress = CourtshipProgress(
-            application_id=application_id,
-            week_number=topic['week'],
-            topic_title=topic['title'],
-            topic_description=topic['description'],
-            status='not_started'
-        )
-        progress_items.append(progress)
-        db.session.add(progress)
-    
-    # Schedule monthly check-ins (6 months = 6 check-ins)
-    start_date = datetime.utcnow()
-    for month in range(6):
-        check_in_date = start_date + timedelta(days=30 * (month + 1))
-        check_in = CheckIn(
-            application_id=application_id,
-            scheduled_date=check_in_date,
-            status='scheduled'
-        )
-        db.session.add(check_in)
-    
-    # Update application stage
-    application.current_stage = 'courtship'
-    
-    # Notify couple
-    notification = Notification(
-        user_id=application.applicant_id,
-        application_id=application_id,
-        title='Courtship Period Started',
-        message='Your 6-month courtship period has begun. Please complete weekly topics.',
-        notification_type='courtship_start'
-    )
-    db.session.add(notification)
-    
     try:
+        # A repeated or concurrent request provisions nothing
+        if not start_courtships([application]):
+            db.session.rollback()
+            return jsonify({'error': 'Courtship already initialized'}), 400
         db.session.commit()
-        return jsonify({
-            'message': 'Courtship initialized successfully',
-            'topics': [p.to_dict() for p in progress_items]
-        }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Initialization failed', 'details': str(e)}), 500
 
+    topics = CourtshipProgress.query.filter_by(
+        application_id=application_id
+    ).order_by(CourtshipProgress.week_number).all()
+    return jsonify({
+        'message': 'Courtship initialized successfully',
+        'topics': [topic.to_dict() for topic in topics]
+    }), 201
+
+
+@courtship_bp.route('/applications/initialize', methods=['POST'])
+@login_required
+def initialize_courtships():
+    """Initialize the courtship period for a batch of approved applications"""
+    if current_user.role not in ['committee_member', 'central_committee', 'overseer']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json() or {}
+    application_ids = data.get('application_ids')
+    if not isinstance(application_ids, list) or not all(isinstance(i, int) for i in application_ids):
+        return jsonify({'error': 'application_ids must be a list of integers'}), 400
+    application_ids = set(application_ids)
+    if len(application_ids) > MAX_BULK_APPLICATIONS:
+        return jsonify({'error': f'At most {MAX_BULK_APPLICATIONS} applications per request'}), 400
+
+    applications = eligible_applications(application_ids, current_user)
+    eligible = {application.id for application in applications}
+    try:
+        initialized = start_courtships(applications)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Initialization failed', 'details': str(e)}), 500
+
+    return jsonify({
+        'message': f'Initialized {len(initialized)} courtships',
+        'initialized': sorted(initialized),
+        # Already initialized (possibly by a concurrent request)
+        'skipped': sorted(eligible - initialized),
+        # Missing, not approved, or outside the committee member's region
+        'not_eligible': sorted(application_ids - eligible)
+    }), 200
+
 
 @courtship_bp.route('/applications/<int:application_id>/topics', methods=['GET'])
 @login_required
@@ -247,27 +223,18 @@ def get_courtship_progress(application_id):
     if current_user.role == 'single' and application.applicant_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Count completed topics
-    total_topics = CourtshipProgress.query.filter_by(application_id=application_id).count()
-    completed_topics = CourtshipProgress.query.filter_by(
-        application_id=application_id,
-        status='completed'
-    ).count()
-    
-    # Count completed check-ins
-    total_checkins = CheckIn.query.filter_by(application_id=application_id).count()
-    completed_checkins = CheckIn.query.filter_by(
-        application_id=application_id,
-        status='completed'
-    ).count()
+    summary = courtship_summary(application_id)
     
-    progress_percentage = (completed_topics / total_topics * 100) if total_topics > 0 else 0
+    progress_percentage = (
+        summary.topics_completed / summary.topics_total * 100
+    ) if summary.topics_total > 0 else 0
     
     return jsonify({
-        'total_topics': total_topics,
-        'completed_topics': completed_topics,
-        'total_checkins': total_checkins,
-        'completed_checkins': completed_checkins,
+        'total_topics': summary.topics_total,
+        'completed_topics': summary.topics_completed,
+        'in_progress_topics': summary.topics_in_progress,
+        'total_checkins': summary.check_ins_total,
+        'completed_checkins': summary.check_ins_completed,
+        'next_checkin': summary.next_check_in.isoformat() if summary.next_check_in else None,
         'progress_percentage': round(progress_percentage, 2)
     }), 200
-
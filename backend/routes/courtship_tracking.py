@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from models import db, CourtshipProgress, Application
 from datetime import datetime, timedelta
-from courtship_curriculum import COURTSHIP_TOPICS
+from services.courtship import provision_courtships, courtship_summary
+from services.curriculum import curriculum, cached_response
 
 courtship_tracking_bp = Blueprint('courtship_tracking', __name__)
 
@@ -10,25 +12,22 @@ courtship_tracking_bp = Blueprint('courtship_tracking', __name__)
 @courtship_tracking_bp.route('/topics', methods=['GET'])
 @login_required
 def get_all_topics():
-    """Get all 25 weeks of courtship topics"""
-    return jsonify({
-        'topics': COURTSHIP_TOPICS,
-        'total_weeks': len(COURTSHIP_TOPICS)
-    }), 200
+    """Get every week of the courtship topics"""
+    return cached_response(curriculum.topics_response)
 
 
 @courtship_tracking_bp.route('/topics/<int:week>', methods=['GET'])
 @login_required
 def get_topic_by_week(week):
     """Get specific week's topic content"""
-    if week < 1 or week > 25:
-        return jsonify({'error': 'Week must be between 1 and 25'}), 400
+    if week < 1 or week > curriculum.total_weeks:
+        return jsonify({'error': f'Week must be between 1 and {curriculum.total_weeks}'}), 400
     
-    topic = next((t for t in COURTSHIP_TOPICS if t['week'] == week), None)
-    if not topic:
+    rendered = curriculum.week_responses.get(week)
+    if not rendered:
         return jsonify({'error': 'Topic not found'}), 404
     
-    return jsonify({'topic': topic}), 200
+    return cached_response(rendered)
 
 
 @courtship_tracking_bp.route('/progress/<int:application_id>', methods=['GET'])
@@ -45,15 +44,15 @@ def get_progress(application_id):
     # Get all progress records for this application
     progress_records = CourtshipProgress.query.filter_by(
         application_id=application_id
-    ).order_by(CourtshipProgress.week_number).all()
+    ).options(joinedload(CourtshipProgress.updated_by_user)).order_by(CourtshipProgress.week_number).all()
     
     # Create progress map
     progress_map = {p.week_number: p for p in progress_records}
     
-    # Build response with all 25 weeks
+    # Build response with every week of the curriculum
     weeks_data = []
-    for week_num in range(1, 26):
-        topic = next((t for t in COURTSHIP_TOPICS if t['week'] == week_num), None)
+    for week_num in range(1, curriculum.total_weeks + 1):
+        topic = curriculum.topic(week_num)
         progress = progress_map.get(week_num)
         
         week_data = {
@@ -69,8 +68,10 @@ def get_progress(application_id):
         weeks_data.append(week_data)
     
     # Calculate stats
-    completed = len([p for p in progress_records if p.status == 'completed'])
-    in_progress = len([p for p in progress_records if p.status == 'in_progress'])
+    summary = courtship_summary(application_id)
+    total = curriculum.total_weeks
+    completed = summary.topics_completed
+    in_progress = summary.topics_in_progress
     
     return jsonify({
         'application_id': application_id,
@@ -78,9 +79,12 @@ def get_progress(application_id):
         'stats': {
             'completed': completed,
             'in_progress': in_progress,
-            'not_started': 25 - completed - in_progress,
-            'total': 25,
-            'progress_percentage': round((completed / 25) * 100, 1)
+            'not_started': total - completed - in_progress,
+            'total': total,
+            'progress_percentage': round((completed / total) * 100, 1),
+            'check_ins_completed': summary.check_ins_completed,
+            'check_ins_total': summary.check_ins_total,
+            'next_check_in': summary.next_check_in.isoformat() if summary.next_check_in else None
         }
     }), 200
 
@@ -89,8 +93,8 @@ def get_progress(application_id):
 @login_required
 def update_progress(application_id, week):
     """Update progress for a specific week"""
-    if week < 1 or week > 25:
-        return jsonify({'error': 'Week must be between 1 and 25'}), 400
+    if week < 1 or week > curriculum.total_weeks:
+        return jsonify({'error': f'Week must be between 1 and {curriculum.total_weeks}'}), 400
     
     # Check if user has access
     application = Application.query.get_or_404(application_id)
@@ -173,15 +177,17 @@ def get_current_week(application_id):
         if current_user.role not in ['committee_member', 'central_committee', 'overseer']:
             return jsonify({'error': 'Unauthorized'}), 403
     
+    # All of the couple's weeks in one query
+    progress_map = {p.week_number: p for p in CourtshipProgress.query.options(
+        joinedload(CourtshipProgress.updated_by_user)
+    ).filter_by(application_id=application_id)}
+    
     # Find the first incomplete week
-    for week_num in range(1, 26):
-        progress = CourtshipProgress.query.filter_by(
-            application_id=application_id,
-            week_number=week_num
-        ).first()
+    for week_num in range(1, curriculum.total_weeks + 1):
+        progress = progress_map.get(week_num)
         
         if not progress or progress.status != 'completed':
-            topic = next((t for t in COURTSHIP_TOPICS if t['week'] == week_num), None)
+            topic = curriculum.topic(week_num)
             return jsonify({
                 'current_week': week_num,
                 'topic': topic,
@@ -193,16 +199,16 @@ def get_current_week(application_id):
     
     # All weeks completed
     return jsonify({
-        'current_week': 25,
+        'current_week': curriculum.total_weeks,
         'completed': True,
-        'message': 'Congratulations! You have completed all 25 weeks of courtship'
+        'message': f'Congratulations! You have completed all {curriculum.total_weeks} weeks of courtship'
     }), 200
 
 
 @courtship_tracking_bp.route('/progress/<int:application_id>/initialize', methods=['POST'])
 @login_required
 def initialize_progress(application_id):
-    """Initialize all 25 weeks for an application"""
+    """Initialize every curriculum week for an application"""
     application = Application.query.get_or_404(application_id)
     
     # Allow the applicant, partner, or committee to initialize
@@ -210,32 +216,23 @@ def initialize_progress(application_id):
         if current_user.role not in ['committee_member', 'central_committee', 'overseer']:
             return jsonify({'error': 'Unauthorized'}), 403
     
-    # Check if already initialized
-    existing = CourtshipProgress.query.filter_by(application_id=application_id).first()
-    if existing:
-        return jsonify({'message': 'Progress already initialized'}), 200
-    
-    # Create all 25 week records
+    # Create every week record (and the monthly check-ins); rows that
+    # already exist, e.g. from a double-click, are skipped
     try:
-        for week_num in range(1, 26):
-            progress = CourtshipProgress(
-                application_id=application_id,
-                week_number=week_num,
-                status='not_started'
-            )
-            db.session.add(progress)
-        
+        provisioned = provision_courtships([application_id])
         db.session.commit()
-        return jsonify({'message': 'Successfully initialized 25 weeks of courtship tracking'}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to initialize progress', 'details': str(e)}), 500
 
+    if not provisioned:
+        return jsonify({'message': 'Progress already initialized'}), 200
+    return jsonify({'message': f'Successfully initialized {curriculum.total_weeks} weeks of courtship tracking'}), 201
+
 
 @courtship_tracking_bp.route('/supervisor-notes', methods=['GET'])
 @login_required
 def get_supervisor_notes():
     """Get courtship supervisor duties and guidelines"""
-    from courtship_curriculum import COURTSHIP_SUPERVISOR_DUTIES
-    return jsonify(COURTSHIP_SUPERVISOR_DUTIES), 200
+    return cached_response(curriculum.supervisor_duties_response)
 
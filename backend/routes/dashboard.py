@@ -1,8 +1,14 @@
+import math
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Application, User, StageHistory, CourtshipProgress, CheckIn
+from models import db, Application, User, CheckIn
 from datetime import datetime, timedelta
 from sqlalchemy import func, extract
+from services.dashboard_stats import (
+    application_counts, rollup_counts, window_counts, courtship_completion, COMPLETION_SORTS
+)
+from services.loaders import application_list_options, check_in_list_options
+from services.rollups import application_rollup_rows, user_rollup_rows
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -24,54 +30,26 @@ def get_dashboard_stats():
             User.region == current_user.region
         )
     
-    # Total applications
-    total = query.count()
-    
-    # By status - use Application.status explicitly to avoid ambiguity
-    pending = query.filter(Application.status == 'pending').count()
-    approved = query.filter(Application.status == 'approved').count()
-    rejected = query.filter(Application.status == 'rejected').count()
-    on_hold = query.filter(Application.status == 'on_hold').count()
-    
-    # Recent applications (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent = query.filter(Application.created_at >= thirty_days_ago).count()
-    
-    # Applications by stage
-    stages_query = query.with_entities(
-        Application.current_stage,
-        func.count(Application.id)
-    ).group_by(Application.current_stage).all()
-    
-    stages_dict = {stage: count for stage, count in stages_query}
-    
-    # Applications this month
-    current_month = datetime.utcnow().month
-    current_year = datetime.utcnow().year
-    this_month = query.filter(
-        extract('month', Application.created_at) == current_month,
-        extract('year', Application.created_at) == current_year
-    ).count()
+    if current_user.role == 'single':
+        stats = application_counts(query)
+    else:
+        # Committee-wide scopes read status/stage totals from the rollups and
+        # only scan the recent window for the time-based counters
+        stats = rollup_counts(
+            region=current_user.region,
+            scoped=current_user.role == 'committee_member'
+        )
+        stats.update(window_counts(query))
+        stats['my_assigned'] = 0
     
     # My assigned applications (for committee members)
-    my_assigned = 0
     if current_user.role in ['committee_member', 'central_committee']:
-        my_assigned = Application.query.filter_by(
+        stats['my_assigned'] = Application.query.filter_by(
             assigned_committee_member_id=current_user.id,
             status='pending'
         ).count()
     
-    return jsonify({
-        'total_applications': total,
-        'pending': pending,
-        'approved': approved,
-        'rejected': rejected,
-        'on_hold': on_hold,
-        'recent_applications': recent,
-        'this_month': this_month,
-        'by_stage': stages_dict,
-        'my_assigned': my_assigned
-    }), 200
+    return jsonify(stats), 200
 
 
 @dashboard_bp.route('/recent-activity', methods=['GET'])
@@ -91,14 +69,16 @@ def get_recent_activity():
             User.region == current_user.region
         )
     
-    # Get recent applications with their stage history
-    applications = query.order_by(Application.updated_at.desc()).limit(limit).all()
+    # Get recent applications with their applicant and stage history loaded
+    # alongside, rather than one query per application
+    applications = query.order_by(Application.updated_at.desc()).options(
+        *application_list_options(stage_history=True)
+    ).limit(limit).all()
     
     activity = []
     for app in applications:
-        latest_stage = StageHistory.query.filter_by(
-            application_id=app.id
-        ).order_by(StageHistory.started_at.desc()).first()
+        started = [stage.started_at for stage in app.stage_history if stage.started_at]
+        latest_update = max(started) if started else app.updated_at
         
         activity.append({
             'application_id': app.id,
@@ -106,7 +86,7 @@ def get_recent_activity():
             'applicant_name': app.applicant.full_name,
             'current_stage': app.current_stage,
             'status': app.status,
-            'latest_update': latest_stage.started_at.isoformat() if latest_stage else app.updated_at.isoformat(),
+            'latest_update': latest_update.isoformat(),
             'updated_at': app.updated_at.isoformat()
         })
     
@@ -136,7 +116,7 @@ def get_upcoming_checkins():
     check_ins = query.filter(
         CheckIn.scheduled_date <= thirty_days_later,
         CheckIn.scheduled_date >= datetime.utcnow()
-    ).order_by(CheckIn.scheduled_date).all()
+    ).order_by(CheckIn.scheduled_date).options(*check_in_list_options()).all()
     
     results = []
     for check_in in check_ins:
@@ -216,41 +196,53 @@ def get_locations():
 @dashboard_bp.route('/courtship-completion', methods=['GET'])
 @login_required
 def get_courtship_completion():
-    """Get courtship completion statistics"""
+    """Get courtship completion statistics, a page at a time"""
     
     if current_user.role not in ['committee_member', 'central_committee', 'overseer']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Get applications in courtship
-    query = Application.query.filter_by(current_stage='courtship')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    sort = request.args.get('sort', 'progress')
+    order = request.args.get('order', 'desc')
+    if sort not in COMPLETION_SORTS or order not in ('asc', 'desc'):
+        return jsonify({
+            'error': f"sort must be one of {', '.join(COMPLETION_SORTS)} and order asc or desc"
+        }), 400
+    
+    # Get applications in courtship, with their applicants' names
+    query = Application.query.filter_by(current_stage='courtship').join(
+        User, Application.applicant_id == User.id
+    )
     
     # Filter by region for committee members
     if current_user.role == 'committee_member':
-        query = query.join(User, Application.applicant_id == User.id).filter(
-            User.region == current_user.region
-        )
+        query = query.filter(User.region == current_user.region)
+    
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 200)
     
-    applications = query.all()
+    # Count the couples without joining their progress rows
+    total = query.order_by(None).count()
+    rows = courtship_completion(query, sort, order == 'desc').limit(per_page).offset((page - 1) * per_page).all()
     
     results = []
-    for app in applications:
-        total_topics = CourtshipProgress.query.filter_by(application_id=app.id).count()
-        completed_topics = CourtshipProgress.query.filter_by(
-            application_id=app.id,
-            status='completed'
-        ).count()
-        
-        progress = (completed_topics / total_topics * 100) if total_topics > 0 else 0
-        
+    for application_id, number, name, total_topics, completed_topics, progress in rows:
         results.append({
-            'application_number': app.application_number,
-            'applicant_name': app.applicant.full_name,
+            'application_id': application_id,
+            'application_number': number,
+            'applicant_name': name,
             'total_topics': total_topics,
-            'completed_topics': completed_topics,
-            'progress': round(progress, 2)
+            'completed_topics': int(completed_topics),
+            'progress': round(float(progress), 2)
         })
     
-    return jsonify({'courtship_data': results}), 200
+    return jsonify({
+        'courtship_data': results,
+        'total': total,
+        'pages': math.ceil(total / per_page),
+        'current_page': page
+    }), 200
 
 
 @dashboard_bp.route('/regional-statistics', methods=['GET'])
@@ -267,75 +259,53 @@ def get_regional_statistics():
     if current_user.role == 'committee_member':
         region_filter = current_user.region
     
-    # Build query for regions
-    query = db.session.query(
-        User.region,
-        func.count(func.distinct(User.id)).label('total_singles'),
-        func.count(func.distinct(Application.id)).label('total_applications')
-    ).outerjoin(
-        Application, Application.applicant_id == User.id
-    ).filter(
-        User.role == 'single',
-        User.region.isnot(None),
-        User.is_active == True
-    )
-    
-    # Apply region filter for committee members
-    if region_filter:
-        query = query.filter(User.region == region_filter)
+    # Active singles per region x division x gender, from the user rollups
+    singles_rows = user_rollup_rows('region', 'division', 'gender', role='single', is_active=True)
     
-    # Group by region
-    query = query.group_by(User.region).order_by(User.region)
+    # Applications per region x applicant active flag x status, from the
+    # application rollups
+    application_rows = application_rollup_rows(
+        'region', 'applicant_active', 'status', applicant_role='single'
+    )
     
-    results = query.all()
+    singles_by_region = {}
+    divisions_by_region = {}
+    gender_by_region = {}
+    total_singles = 0
+    for region, division, gender, count in singles_rows:
+        if region_filter and region != region_filter:
+            continue
+        total_singles += count
+        if region is None or not count:
+            continue
+        singles_by_region[region] = singles_by_region.get(region, 0) + count
+        if division is not None:
+            divisions = divisions_by_region.setdefault(region, {})
+            divisions[division] = divisions.get(division, 0) + count
+        if gender:
+            genders = gender_by_region.setdefault(region, {})
+            genders[gender] = genders.get(gender, 0) + count
+    
+    applications_by_region = {}
+    status_by_region = {}
+    for region, applicant_active, status, count in application_rows:
+        if region is None:
+            continue
+        if applicant_active:
+            applications_by_region[region] = applications_by_region.get(region, 0) + count
+        statuses = status_by_region.setdefault(region, {})
+        statuses[status] = statuses.get(status, 0) + count
     
     regional_data = []
-    for region, singles_count, apps_count in results:
-        # Get breakdown by application status for this region
-        status_query = db.session.query(
-            Application.status,
-            func.count(Application.id)
-        ).join(
-            User, Application.applicant_id == User.id
-        ).filter(
-            User.region == region,
-            User.role == 'single'
-        ).group_by(Application.status).all()
-        
-        status_breakdown = {status: count for status, count in status_query}
-        
-        # Get breakdown by division within this region
-        divisions_query = db.session.query(
-            User.division,
-            func.count(func.distinct(User.id)).label('singles_count')
-        ).filter(
-            User.role == 'single',
-            User.region == region,
-            User.division.isnot(None),
-            User.is_active == True
-        ).group_by(User.division).order_by(User.division).all()
-        
-        divisions_data = [
-            {'division': div, 'singles_count': count}
-            for div, count in divisions_query
-        ]
-        
-        # Get singles by gender
-        gender_query = db.session.query(
-            User.gender,
-            func.count(User.id)
-        ).filter(
-            User.role == 'single',
-            User.region == region,
-            User.is_active == True
-        ).group_by(User.gender).all()
-        
-        gender_breakdown = {gender: count for gender, count in gender_query if gender}
+    for region in sorted(singles_by_region):
+        status_breakdown = status_by_region.get(region, {})
+        gender_breakdown = gender_by_region.get(region, {})
+        divisions = divisions_by_region.get(region, {})
         
         regional_data.append({
             'region': region,
-            'total_singles': singles_count,
-            'total_applications': apps_count,
+            'total_singles': singles_by_region[region],
+            'total_applications': applications_by_region.get(region, 0),
             'brothers': gender_breakdown.get('male', 0),
             'sisters': gender_breakdown.get('female', 0),
             'applications_by_status': {
@@ -344,22 +314,18 @@ def get_regional_statistics():
                 'rejected': status_breakdown.get('rejected', 0),
                 'on_hold': status_breakdown.get('on_hold', 0)
             },
-            'divisions': divisions_data
+            'divisions': [
+                {'division': division, 'singles_count': divisions[division]}
+                for division in sorted(divisions)
+            ]
         })
     
     # Get overall summary
-    if not region_filter:
-        total_singles = User.query.filter_by(role='single', is_active=True).count()
-        total_applications = Application.query.count()
-    else:
-        total_singles = User.query.filter_by(
-            role='single',
-            region=region_filter,
-            is_active=True
-        ).count()
-        total_applications = Application.query.join(
-            User, Application.applicant_id == User.id
-        ).filter(User.region == region_filter).count()
+    total_applications = sum(
+        count for _, count in application_rollup_rows(
+            'region', region=region_filter, scoped=bool(region_filter)
+        )
+    )
     
     return jsonify({
         'regional_data': regional_data,
@@ -369,4 +335,3 @@ def get_regional_statistics():
             'total_regions': len(regional_data)
         }
     }), 200
-
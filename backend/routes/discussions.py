@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import db, Discussion, DiscussionReply, Notification
 from datetime import datetime
+from services.pagination import keyset_paginate, InvalidCursor
 
 discussions_bp = Blueprint('discussions', __name__)
 
@@ -105,6 +106,30 @@ def get_discussions():
     if category:
         query = query.filter_by(category=category)
     
+    # Cursor mode: keyset pagination on (pinned, created_at, id), no total count.
+    # The pinned flag is compared as an integer; booleans only support equality.
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = keyset_paginate(
+                query,
+                [
+                    (db.cast(db.func.coalesce(Discussion.is_pinned, False), db.Integer), True),
+                    (Discussion.created_at, True),
+                    (Discussion.id, True)
+                ],
+                cursor=cursor,
+                per_page=per_page
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'discussions': [disc.to_dict() for disc in items],
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }), 200
+    
     # Order by pinned first, then most recent
     query = query.order_by(Discussion.is_pinned.desc(), Discussion.created_at.desc())
     
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Application, MedicalTest, StageHistory, Notification
+from models import db, Application, MedicalTest, StageHistory
 from datetime import datetime
+from services.notifications import queue_notification
 
 medical_bp = Blueprint('medical', __name__)
 
@@ -39,14 +40,13 @@ def create_medical_test(application_id):
         db.session.add(medical_test)
         
         # Notify applicant
-        notification = Notification(
-            user_id=application.applicant_id,
-            application_id=application_id,
-            title='Medical Test Requested',
-            message=f'Please proceed with medical tests at {data["hospital_name"]}',
-            notification_type='medical_test'
+        queue_notification(
+            application.applicant_id,
+            'Medical Test Requested',
+            f'Please proceed with medical tests at {data["hospital_name"]}',
+            'medical_test',
+            application_id
         )
-        db.session.add(notification)
         
         db.session.commit()
         
@@ -194,14 +194,13 @@ def check_medical_compatibility(application_id):
         db.session.add(stage)
         
         # Notify applicant
-        notification = Notification(
-            user_id=application.applicant_id,
-            application_id=application_id,
-            title='Medical Results',
-            message='Unfortunately, there are medical compatibility concerns. Please contact the committee.',
-            notification_type='medical_result'
+        queue_notification(
+            application.applicant_id,
+            'Medical Results',
+            'Unfortunately, there are medical compatibility concerns. Please contact the committee.',
+            'medical_result',
+            application_id
         )
-        db.session.add(notification)
     else:
         # Compatible - move to next stage
         application.current_stage = 'first_meeting_scheduled'
@@ -220,14 +219,13 @@ def check_medical_compatibility(application_id):
         db.session.add(stage)
         
         # Notify applicant
-        notification = Notification(
-            user_id=application.applicant_id,
-            application_id=application_id,
-            title='Medical Results',
-            message='Great news! Medical tests show compatibility. Next step: First meeting.',
-            notification_type='medical_result'
+        queue_notification(
+            application.applicant_id,
+            'Medical Results',
+            'Great news! Medical tests show compatibility. Next step: First meeting.',
+            'medical_result',
+            application_id
         )
-        db.session.add(notification)
     
     db.session.commit()
 
@@ -1,24 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Meeting, Application, Notification
+from models import db, Meeting, Application
 from datetime import datetime
+from services.notifications import queue_notification
 import json
 
 meetings_bp = Blueprint('meetings', __name__)
 
 
-def create_notification(user_id, title, message, notification_type, application_id=None):
-    """Create a notification for a user"""
-    notification = Notification(
-        user_id=user_id,
-        application_id=application_id,
-        title=title,
-        message=message,
-        notification_type=notification_type
-    )
-    db.session.add(notification)
-
-
 @meetings_bp.route('/applications/<int:application_id>/meetings', methods=['POST'])
 @login_required
 def schedule_meeting(application_id):
@@ -62,7 +51,7 @@ def schedule_meeting(application_id):
         db.session.add(meeting)
         
         # Notify applicant
-        create_notification(
+        queue_notification(
             application.applicant_id,
             'Meeting Scheduled',
             f'A {meeting.meeting_type} meeting has been scheduled for {scheduled_date.strftime("%B %d, %Y at %I:%M %p")}',
@@ -156,18 +145,17 @@ def update_meeting(meeting_id):
     meeting.updated_at = datetime.utcnow()
     
     try:
-        db.session.commit()
-        
-        # Notify applicant if status changed
+        # Notify applicant if status changed (committed with the update)
         if 'status' in data or 'scheduled_date' in data:
-            create_notification(
+            queue_notification(
                 meeting.application.applicant_id,
                 'Meeting Updated',
                 f'Your {meeting.meeting_type} meeting has been updated',
                 'meeting_updated',
                 meeting.application_id
             )
-            db.session.commit()
+        
+        db.session.commit()
         
         return jsonify({
             'message': 'Meeting updated successfully',
@@ -191,7 +179,7 @@ def delete_meeting(meeting_id):
     
     try:
         # Notify applicant
-        create_notification(
+        queue_notification(
             meeting.application.applicant_id,
             'Meeting Cancelled',
             f'Your {meeting.meeting_type} meeting scheduled for {meeting.scheduled_date.strftime("%B %d, %Y")} has been cancelled',
@@ -1,10 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
 from flask_login import login_required, current_user
-from models import db, Notification
-from datetime import datetime
+from sqlalchemy import select
+from models import db, Notification, User
+from datetime import datetime, timedelta
+from services.events import subscribe, StreamLimitReached
+from services.notifications import mark_read, delete_read, delete_notification as delete_users_notification
+from services.pagination import keyset_paginate, InvalidCursor
+import json
+import time
 
 notifications_bp = Blueprint('notifications', __name__)
 
+# Keeps the IN (...) list well inside database parameter limits
+MAX_BULK_IDS = 1000
+
+
+def _missing(notification_id):
+    """404 or 403 for a notification the current user can't change, else None"""
+    owner_id = db.session.scalar(select(Notification.user_id).where(Notification.id == notification_id))
+    if owner_id is None:
+        return jsonify({'error': 'Notification not found'}), 404
+    if owner_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return None
+
+
 @notifications_bp.route('/', methods=['GET'])
 @login_required
 def get_notifications():
@@ -18,18 +38,35 @@ def get_notifications():
     if unread_only:
         query = query.filter_by(read=False)
     
+    # Denormalized counter on the already-loaded user row
+    unread_count = current_user.unread_notification_count
+    
+    # Cursor mode: keyset pagination on (created_at, id), no total count
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = keyset_paginate(
+                query,
+                [(Notification.created_at, True), (Notification.id, True)],
+                cursor=cursor,
+                per_page=per_page
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'notifications': [notif.to_dict() for notif in items],
+            'next_cursor': next_cursor,
+            'per_page': per_page,
+            'unread_count': unread_count
+        }), 200
+    
     query = query.order_by(Notification.created_at.desc())
     
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     notifications = [notif.to_dict() for notif in pagination.items]
     
-    # Get unread count
-    unread_count = Notification.query.filter_by(
-        user_id=current_user.id,
-        read=False
-    ).count()
-    
     return jsonify({
         'notifications': notifications,
         'total': pagination.total,
@@ -43,75 +80,156 @@ def get_notifications():
 @login_required
 def mark_as_read(notification_id):
     """Mark notification as read"""
-    notification = Notification.query.get(notification_id)
-    
-    if not notification:
-        return jsonify({'error': 'Notification not found'}), 404
-    
-    if notification.user_id != current_user.id:
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    notification.read = True
-    notification.read_at = datetime.utcnow()
-    
     try:
+        # Conditional UPDATE: a double-click or a concurrent mark-all-read
+        # only decrements the unread counter once
+        count = mark_read(current_user.id, [notification_id])
         db.session.commit()
-        return jsonify({'message': 'Notification marked as read'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Update failed', 'details': str(e)}), 500
+    
+    # Nothing changed: missing, someone else's, or already read
+    if not count:
+        error = _missing(notification_id)
+        if error:
+            return error
+    return jsonify({'message': 'Notification marked as read'}), 200
 
 
 @notifications_bp.route('/mark-all-read', methods=['PUT'])
 @login_required
 def mark_all_as_read():
     """Mark all notifications as read"""
-    notifications = Notification.query.filter_by(
-        user_id=current_user.id,
-        read=False
-    ).all()
+    try:
+        count = mark_read(current_user.id)
+        db.session.commit()
+        return jsonify({'message': f'{count} notifications marked as read'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Update failed', 'details': str(e)}), 500
+
+
+@notifications_bp.route('/mark-read', methods=['PUT'])
+@login_required
+def mark_many_as_read():
+    """Mark a list of notifications as read"""
+    data = request.get_json() or {}
+    ids = data.get('ids')
     
-    for notification in notifications:
-        notification.read = True
-        notification.read_at = datetime.utcnow()
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({'error': 'ids must be a list of notification ids'}), 400
+    
+    if len(ids) > MAX_BULK_IDS:
+        return jsonify({'error': f'At most {MAX_BULK_IDS} ids per request'}), 400
     
     try:
+        # Ids belonging to other users are silently skipped
+        count = mark_read(current_user.id, ids) if ids else 0
         db.session.commit()
-        return jsonify({'message': f'{len(notifications)} notifications marked as read'}), 200
+        return jsonify({'message': f'{count} notifications marked as read', 'updated': count}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Update failed', 'details': str(e)}), 500
 
 
+@notifications_bp.route('/read', methods=['DELETE'])
+@login_required
+def delete_read_notifications():
+    """Delete read notifications older than ?older_than_days= (default 30)"""
+    days = request.args.get('older_than_days', 30, type=int)
+    
+    if days < 0:
+        return jsonify({'error': 'older_than_days must not be negative'}), 400
+    
+    try:
+        count = delete_read(current_user.id, datetime.utcnow() - timedelta(days=days))
+        db.session.commit()
+        return jsonify({'message': f'{count} notifications deleted', 'deleted': count}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Deletion failed', 'details': str(e)}), 500
+
+
 @notifications_bp.route('/<int:notification_id>', methods=['DELETE'])
 @login_required
 def delete_notification(notification_id):
     """Delete a notification"""
-    notification = Notification.query.get(notification_id)
-    
-    if not notification:
-        return jsonify({'error': 'Notification not found'}), 404
-    
-    if notification.user_id != current_user.id:
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     try:
-        db.session.delete(notification)
+        # Conditional DELETE: the unread counter is only decremented by
+        # the request that actually deleted an unread notification
+        deleted = delete_users_notification(current_user.id, notification_id)
         db.session.commit()
-        return jsonify({'message': 'Notification deleted'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Deletion failed', 'details': str(e)}), 500
+    
+    if not deleted:
+        return _missing(notification_id) or (jsonify({'error': 'Notification not found'}), 404)
+    return jsonify({'message': 'Notification deleted'}), 200
 
 
 @notifications_bp.route('/unread-count', methods=['GET'])
 @login_required
 def get_unread_count():
     """Get count of unread notifications"""
-    count = Notification.query.filter_by(
-        user_id=current_user.id,
-        read=False
-    ).count()
-    
-    return jsonify({'unread_count': count}), 200
+    # Maintained by services/notifications.py; no COUNT(*) over notifications
+    return jsonify({'unread_count': current_user.unread_notification_count}), 200
 
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+@notifications_bp.route('/stream', methods=['GET'])
+@login_required
+def stream():
+    """Server-sent events: new notifications and unread counts as they change"""
+    app = current_app._get_current_object()
+    if not app.config['NOTIFICATION_STREAMS']:
+        # EventSource does not reconnect after a 204; the client polls
+        # /unread-count instead
+        return '', 204
+    
+    user_id = current_user.id
+    unread_count = current_user.unread_notification_count
+    timeout = app.config['NOTIFICATION_STREAM_TIMEOUT']
+    keepalive = app.config['NOTIFICATION_STREAM_KEEPALIVE']
+    try:
+        subscription = subscribe(user_id)
+    except StreamLimitReached:
+        # Keep the remaining threads for ordinary requests; EventSource
+        # gives up on a 503 and the client polls instead
+        response = jsonify({'error': 'Too many open notification streams'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    
+    # Runs after this request's context (and database session) is gone;
+    # the connection is only borrowed briefly to read the counter
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            yield _sse('unread_count', {'unread_count': unread_count})
+            
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=min(keepalive, max(deadline - time.monotonic(), 0)))
+                if event is None:
+                    yield ': keepalive\n\n'
+                    continue
+                
+                if event.get('notification'):
+                    yield _sse('notification', event['notification'])
+                
+                with app.app_context():
+                    count = db.session.query(User.unread_notification_count).filter_by(id=user_id).scalar()
+                yield _sse('unread_count', {'unread_count': count or 0})
+        finally:
+            subscription.close()
+    
+    # Streams end after NOTIFICATION_STREAM_TIMEOUT so a thread is never
+    # held forever; EventSource reconnects on its own
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,34 @@
+"""
+Bulk write helpers
+INSERT ... ON CONFLICT for the databases the app runs on (SQLite 3.24+
+and PostgreSQL), so bulk inserts can skip or merge rows that a unique key
+already holds instead of checking for them first.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db
+
+
+def _insert(table, bind=None):
+    dialect = (bind or db.session.get_bind()).dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    raise NotImplementedError(f'INSERT ... ON CONFLICT is not supported on {dialect}')
+
+
+def insert_ignoring_conflicts(table, bind=None):
+    """An INSERT into table that skips rows violating a unique constraint"""
+    return _insert(table, bind).on_conflict_do_nothing()
+
+
+def insert_or_increment(table, index_elements, column, bind=None):
+    """
+    An INSERT into table that, when a row with the same unique
+    index_elements exists, adds the new row's `column` to it instead
+    """
+    statement = _insert(table, bind)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: table.c[column] + statement.excluded[column]}
+    )
@@ -0,0 +1,137 @@
+"""
+Courtship provisioning
+provision_courtships() creates the weekly progress rows (one per
+curriculum week) and the six monthly check-ins for any number of
+applications with multi-row INSERTs, not one statement per row. The
+progress INSERT uses ON CONFLICT DO NOTHING on
+uq_courtship_progress_application_week and returns the applications it
+actually provisioned, so a repeated or concurrent call (a double-click)
+adds nothing. Check-ins are only scheduled for applications that have
+none, so one that already had some weeks gets the missing weeks but no
+second set of check-ins.
+
+courtship_summary() is the read model behind the progress endpoints: topic
+and check-in counts and the next check-in date for one application,
+aggregated in a single statement.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, func, case, true
+from sqlalchemy.orm import contains_eager, joinedload
+from models import db, User, Application, CourtshipProgress, CheckIn
+from services.bulk import insert_ignoring_conflicts
+from services.curriculum import curriculum
+from services.dashboard_stats import _count_where
+from services.notifications import queue_application_notifications
+
+# Monthly check-ins over the six-month courtship
+CHECK_INS = 6
+CHECK_IN_INTERVAL = timedelta(days=30)
+
+CourtshipSummary = namedtuple('CourtshipSummary', [
+    'topics_total', 'topics_completed', 'topics_in_progress',
+    'check_ins_total', 'check_ins_completed', 'next_check_in'
+])
+
+
+def provision_courtships(application_ids, start=None):
+    """
+    Create progress rows and check-ins for the given applications.
+    Returns the set of application ids provisioned by this call;
+    applications that already had every week are left untouched, and
+    those that already had check-ins get no more.
+    """
+    start = start or datetime.utcnow()
+    progress = CourtshipProgress.__table__
+    rows = [
+        {'application_id': application_id, 'week_number': week, 'status': 'not_started',
+         'created_at': start, 'updated_at': start}
+        for application_id in sorted(set(application_ids))
+        for week in range(1, curriculum.total_weeks + 1)
+    ]
+    if not rows:
+        return set()
+
+    # An executemany: SQLAlchemy sends it as multi-row INSERTs in pages
+    # under the database's parameter limit, compiling the statement once
+    result = db.session.execute(
+        insert_ignoring_conflicts(progress).returning(progress.c.application_id), rows
+    )
+    provisioned = set(result.scalars())
+    if not provisioned:
+        return provisioned
+
+    scheduled = set(db.session.scalars(
+        select(CheckIn.application_id).where(CheckIn.application_id.in_(provisioned)).distinct()
+    ))
+    unscheduled = sorted(provisioned - scheduled)
+    if unscheduled:
+        db.session.execute(insert(CheckIn.__table__), [
+            {'application_id': application_id, 'scheduled_date': start + CHECK_IN_INTERVAL * (month + 1),
+             'status': 'scheduled', 'created_at': start, 'updated_at': start}
+            for application_id in unscheduled
+            for month in range(CHECK_INS)
+        ])
+
+    return provisioned
+
+
+def start_courtships(applications):
+    """
+    Provision the applications, move them to the courtship stage and
+    queue the applicants' notifications. Returns the provisioned ids;
+    the caller commits.
+    """
+    provisioned = provision_courtships([application.id for application in applications])
+    started = [application for application in applications if application.id in provisioned]
+    for application in started:
+        # Through the ORM so the rollups follow the stage change
+        application.current_stage = 'courtship'
+    queue_application_notifications(
+        started,
+        'Courtship Period Started',
+        'Your 6-month courtship period has begun. Please complete weekly topics.',
+        'courtship_start'
+    )
+    return provisioned
+
+
+def eligible_applications(application_ids, user):
+    """
+    Approved applications among application_ids that `user` may manage,
+    with their applicants loaded for the rollup hook
+    """
+    query = Application.query.filter(
+        Application.id.in_(application_ids),
+        Application.status == 'approved'
+    )
+    if user.role == 'committee_member':
+        query = query.join(Application.applicant).filter(User.region == user.region)
+        return query.options(contains_eager(Application.applicant)).all()
+    return query.options(joinedload(Application.applicant)).all()
+
+
+def courtship_summary(application_id):
+    """
+    Progress counts for one application in one query: the progress rows
+    and the check-ins are each aggregated in a one-row subquery and the
+    two are selected side by side. next_check_in is the earliest check-in
+    still scheduled (possibly overdue), or None.
+    """
+    topics = select(
+        func.count(CourtshipProgress.id).label('total'),
+        _count_where(CourtshipProgress.status == 'completed').label('completed'),
+        _count_where(CourtshipProgress.status == 'in_progress').label('in_progress')
+    ).where(CourtshipProgress.application_id == application_id).subquery()
+
+    check_ins = select(
+        func.count(CheckIn.id).label('total'),
+        _count_where(CheckIn.status == 'completed').label('completed'),
+        func.min(case((CheckIn.status == 'scheduled', CheckIn.scheduled_date))).label('next_scheduled')
+    ).where(CheckIn.application_id == application_id).subquery()
+
+    row = db.session.execute(select(
+        topics.c.total, topics.c.completed, topics.c.in_progress,
+        check_ins.c.total, check_ins.c.completed, check_ins.c.next_scheduled
+    ).select_from(topics.join(check_ins, true()))).one()
+    return CourtshipSummary(*(int(value) for value in row[:5]), row[5])
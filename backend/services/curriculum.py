@@ -0,0 +1,70 @@
+"""
+Courtship curriculum registry
+courtship_curriculum.py is loaded once at import into read-only,
+week-indexed structures, and the JSON bodies of the curriculum endpoints
+are rendered once with an ETag (a hash of the body). Those endpoints
+answer If-None-Match with 304 Not Modified and let browsers keep the
+content for CURRICULUM_MAX_AGE seconds, so repeat loads send no body and
+serialize nothing. A deploy that edits the curriculum changes the ETags.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from flask import current_app, request
+from courtship_curriculum import COURTSHIP_TOPICS, COURTSHIP_SUPERVISOR_DUTIES
+
+Rendered = namedtuple('Rendered', ['body', 'etag'])
+
+
+class ReadOnlyDict(dict):
+    """A dict that refuses changes (and still serializes as JSON)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('curriculum data is read-only')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _render(payload):
+    # Same output as jsonify in production: sorted keys, compact, ASCII
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode() + b'\n'
+    return Rendered(body, hashlib.sha256(body).hexdigest()[:32])
+
+
+class Curriculum:
+    """The 25-week topics, indexed by week, with pre-rendered responses"""
+
+    def __init__(self, topics, supervisor_duties):
+        self.topics = tuple(_freeze(topic) for topic in sorted(topics, key=lambda topic: topic['week']))
+        self.by_week = ReadOnlyDict((topic['week'], topic) for topic in self.topics)
+        self.total_weeks = len(self.topics)
+        self.supervisor_duties = _freeze(supervisor_duties)
+
+        self.topics_response = _render({'topics': self.topics, 'total_weeks': self.total_weeks})
+        self.week_responses = ReadOnlyDict((week, _render({'topic': topic})) for week, topic in self.by_week.items())
+        self.supervisor_duties_response = _render(self.supervisor_duties)
+
+    def topic(self, week):
+        return self.by_week.get(week)
+
+
+curriculum = Curriculum(COURTSHIP_TOPICS, COURTSHIP_SUPERVISOR_DUTIES)
+
+
+def cached_response(rendered):
+    """A 200 with the pre-rendered body, or a 304 if the client has it"""
+    response = current_app.response_class(rendered.body, mimetype='application/json')
+    response.set_etag(rendered.etag)
+    # Only signed-in users may read it, so shared caches must not keep it
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['CURRICULUM_MAX_AGE']
+    return response.make_conditional(request)
@@ -0,0 +1,156 @@
+"""
+Dashboard aggregation layer
+Computes application counters in a single conditional-aggregate pass, or
+from the materialized rollups for committee-wide scopes
+"""
+from models import db, Application, User, CourtshipProgress
+from services.rollups import application_rollup_rows
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+
+STATUSES = ['pending', 'approved', 'rejected', 'on_hold']
+
+
+def _count_where(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END)"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def month_bounds(now=None):
+    """Return the start of the current month and the start of the next one"""
+    now = now or datetime.utcnow()
+    start = datetime(now.year, now.month, 1)
+    if now.month == 12:
+        end = datetime(now.year + 1, 1, 1)
+    else:
+        end = datetime(now.year, now.month + 1, 1)
+    return start, end
+
+
+def application_counts(query, now=None):
+    """
+    Aggregate status, stage, recent and monthly counts for an already
+    role-scoped Application query.
+    
+    Everything is computed in one GROUP BY current_stage pass; the
+    per-status totals are the sum of the per-stage rows.
+    """
+    now = now or datetime.utcnow()
+    thirty_days_ago = now - timedelta(days=30)
+    month_start, month_end = month_bounds(now)
+    
+    columns = [
+        Application.current_stage,
+        func.count(Application.id),
+        _count_where(Application.created_at >= thirty_days_ago),
+        _count_where(db.and_(
+            Application.created_at >= month_start,
+            Application.created_at < month_end
+        )),
+    ]
+    columns += [_count_where(Application.status == status) for status in STATUSES]
+    
+    rows = query.with_entities(*columns).group_by(Application.current_stage).all()
+    
+    result = {
+        'total_applications': 0,
+        'recent_applications': 0,
+        'this_month': 0,
+        'by_stage': {},
+        'my_assigned': 0,
+    }
+    for status in STATUSES:
+        result[status] = 0
+    
+    for row in rows:
+        stage, total, recent, this_month = row[:4]
+        result['by_stage'][stage] = total
+        result['total_applications'] += total
+        result['recent_applications'] += int(recent)
+        result['this_month'] += int(this_month)
+        for status, count in zip(STATUSES, row[4:]):
+            result[status] += int(count)
+    
+    return result
+
+
+def window_counts(query, now=None):
+    """
+    Recent (last 30 days) and this-month counts for a role-scoped query.
+    
+    Only rows inside the earlier of the two windows are read, so the cost
+    depends on recent volume rather than the size of the table.
+    """
+    now = now or datetime.utcnow()
+    thirty_days_ago = now - timedelta(days=30)
+    month_start, month_end = month_bounds(now)
+    
+    recent, this_month = query.with_entities(
+        _count_where(Application.created_at >= thirty_days_ago),
+        _count_where(Application.created_at >= month_start)
+    ).filter(
+        Application.created_at >= min(thirty_days_ago, month_start),
+        Application.created_at < max(now, month_end)
+    ).one()
+    
+    return {'recent_applications': int(recent), 'this_month': int(this_month)}
+
+
+def rollup_counts(region=None, scoped=False):
+    """Total, per-status and per-stage counts read from the application rollups"""
+    result = {
+        'total_applications': 0,
+        'by_stage': {},
+    }
+    for status in STATUSES:
+        result[status] = 0
+    
+    for status, stage, count in application_rollup_rows('status', 'current_stage', region=region, scoped=scoped):
+        if not count:
+            continue
+        result['total_applications'] += count
+        result['by_stage'][stage] = result['by_stage'].get(stage, 0) + count
+        if status in STATUSES:
+            result[status] += count
+    
+    return result
+
+
+# Sort keys accepted by courtship_completion()
+COMPLETION_SORTS = ('progress', 'applicant_name', 'application_number')
+
+
+def courtship_completion(query, sort='progress', descending=True):
+    """
+    Topic totals and completion for every application in a role-scoped
+    Application query already joined to its applicant (User).
+    
+    The applications' progress rows are joined and grouped in the same
+    statement (COUNT and SUM(CASE status = 'completed')), so a page costs
+    one query however many couples it lists. Rows are (application_id,
+    application_number, applicant_name, total_topics, completed_topics,
+    progress), ordered by `sort`.
+    """
+    total = func.count(CourtshipProgress.id)
+    completed = _count_where(CourtshipProgress.status == 'completed')
+    progress = func.coalesce(completed * 100.0 / func.nullif(total, 0), 0)
+    
+    key = {
+        'progress': progress,
+        'applicant_name': User.full_name,
+        'application_number': Application.application_number,
+    }[sort]
+    direction = db.desc if descending else db.asc
+    
+    return query.outerjoin(
+        CourtshipProgress, CourtshipProgress.application_id == Application.id
+    ).with_entities(
+        Application.id,
+        Application.application_number,
+        User.full_name,
+        total,
+        completed,
+        progress
+    ).group_by(
+        Application.id, Application.application_number, User.full_name
+    ).order_by(direction(key), direction(Application.id))
@@ -0,0 +1,239 @@
+"""
+Notification events (pub/sub for the SSE stream)
+publish() announces that a user's notifications changed; subscribe()
+returns a queue of those events for one user, consumed by
+GET /api/notifications/stream.
+
+Backends (NOTIFICATION_EVENTS_BACKEND):
+- 'memory' (default): events are queued on the session and delivered to
+  subscribers in this process after the transaction commits. Events
+  raised in another process (e.g. a separate outbox worker) are not seen.
+- 'postgres': events are sent with pg_notify() inside the transaction,
+  so PostgreSQL delivers them on commit to every process, where a
+  LISTEN thread feeds the local subscribers. The LISTEN connection is
+  taken from the pool and kept; it is checked with SELECT 1 whenever it
+  has been idle for a minute and replaced if that fails.
+
+Each open stream holds a server thread (or greenlet), so a process admits
+at most NOTIFICATION_STREAM_LIMIT subscribers; subscribe() raises
+StreamLimitReached beyond that (see gunicorn.conf.py for the budget).
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, func, cast, null, Text
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+from models import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notification_events'
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD = 7900
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_BUFFER = 100
+
+
+class StreamLimitReached(Exception):
+    """This process already serves NOTIFICATION_STREAM_LIMIT streams"""
+
+
+class Subscription:
+    """Events for one user, fed by the broker"""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+
+    def put(self, payload):
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            # A slow client only needs the latest state
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(payload)
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """In-process fan-out to subscribers"""
+
+    def __init__(self, limit=0):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._count = 0
+        # Most open subscriptions in this process (0: no limit)
+        self.limit = limit
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            if self.limit and self._count >= self.limit:
+                raise StreamLimitReached()
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._count
+
+    def dispatch(self, user_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(payload)
+
+    def publish(self, session, user_id, payload):
+        # Delivered by _after_commit, dropped by _after_rollback
+        session.info.setdefault('notification_events', []).append((user_id, payload))
+
+    def publish_all(self, session, user_ids):
+        """publish() a bare change event to every id `user_ids` (a select) returns"""
+        for user_id in session.execute(user_ids).scalars():
+            self.publish(session, user_id, {'notification': None})
+
+
+class PostgresBroker(Broker):
+    """Publishes with pg_notify(); one LISTEN connection per process"""
+
+    def __init__(self, engine, limit=0):
+        super().__init__(limit)
+        self.engine = engine
+        self._listener = None
+
+    def publish(self, session, user_id, payload):
+        message = json.dumps({'user_id': user_id, 'payload': payload})
+        if len(message) > MAX_PAYLOAD:
+            message = json.dumps({'user_id': user_id, 'payload': {'notification': None}})
+        session.connection().execute(sql_select(func.pg_notify(CHANNEL, message)))
+
+    def publish_all(self, session, user_ids):
+        # One statement, one NOTIFY per row, however many users match
+        ids = user_ids.subquery()
+        message = func.json_build_object(
+            'user_id', ids.c[0], 'payload', func.json_build_object('notification', null())
+        )
+        session.connection().execute(sql_select(func.pg_notify(CHANNEL, cast(message, Text))).select_from(ids))
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='notification-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                # Connection lost; events sent meanwhile are missed, but
+                # clients catch up with the unread count on the next one
+                logger.exception('LISTEN %s failed, reconnecting', CHANNEL)
+                time.sleep(5)
+
+    def _listen_once(self):
+        connection = self.engine.raw_connection()
+        try:
+            driver_connection = connection.driver_connection
+            driver_connection.autocommit = True
+            cursor = driver_connection.cursor()
+            cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([driver_connection], [], [], 60) == ([], [], []):
+                    # Idle: a connection dropped silently (e.g. by a proxy)
+                    # never becomes readable, so check it; a failure
+                    # raises and _listen() reconnects. Notifications that
+                    # arrive meanwhile are collected into notifies.
+                    cursor.execute('SELECT 1')
+                    cursor.fetchall()
+                else:
+                    driver_connection.poll()
+                while driver_connection.notifies:
+                    notify = driver_connection.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    self.dispatch(message['user_id'], message['payload'])
+        except Exception:
+            # Don't hand a broken connection back to the pool
+            connection.invalidate()
+            raise
+        finally:
+            connection.close()
+
+
+def _broker():
+    return current_app.extensions['notification_events']
+
+
+def publish(user_id, notification=None, session=None):
+    """
+    Announce a change to user_id's notifications in the current
+    transaction; subscribers hear about it once it commits. `notification`
+    is the new notification's dict, when there is one.
+    """
+    _broker().publish(session or db.session(), user_id, {'notification': notification})
+
+
+def publish_all(user_ids, session=None):
+    """publish() to every user id selected by `user_ids`, in one statement"""
+    _broker().publish_all(session or db.session(), user_ids)
+
+
+def subscribe(user_id):
+    return _broker().subscribe(user_id)
+
+
+def _after_commit(session):
+    pending = session.info.pop('notification_events', None)
+    if pending:
+        broker = _broker()
+        for user_id, payload in pending:
+            broker.dispatch(user_id, payload)
+
+
+def _after_rollback(session):
+    session.info.pop('notification_events', None)
+
+
+def init_app(app):
+    """Create the broker for the configured backend"""
+    limit = app.config['NOTIFICATION_STREAM_LIMIT']
+    if app.config.get('NOTIFICATION_EVENTS_BACKEND') == 'postgres':
+        with app.app_context():
+            app.extensions['notification_events'] = PostgresBroker(db.engine, limit)
+    else:
+        app.extensions['notification_events'] = Broker(limit)
+
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
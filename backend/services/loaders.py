@@ -0,0 +1,26 @@
+"""
+Loader options for list endpoints
+Every relationship a serializer touches is loaded up front; anything else
+raises instead of silently issuing one SELECT per row.
+"""
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from models import Application, CheckIn
+
+
+def application_list_options(assigned_member=False, stage_history=False):
+    """Options for queries whose rows are serialized with Application.to_dict"""
+    options = [joinedload(Application.applicant)]
+    if assigned_member:
+        options.append(joinedload(Application.assigned_committee_member))
+    if stage_history:
+        options.append(selectinload(Application.stage_history))
+    options.append(raiseload('*'))
+    return options
+
+
+def check_in_list_options():
+    """Options for check-in lists that show the application number and applicant"""
+    return [
+        joinedload(CheckIn.application).joinedload(Application.applicant),
+        raiseload('*'),
+    ]
@@ -0,0 +1,119 @@
+"""
+Login identifiers
+Users sign in with their username or their email, in any letter case.
+Both are stored lower-cased in the login_identifiers table, whose primary
+key makes them unique across all users ignoring case, so login is a
+single primary key lookup instead of an OR over users.username and
+users.email, and registration checks both in one query.
+
+A Session after_flush hook writes the rows for every ORM insert, update
+or delete of a user; a clash with another user's identifier fails the
+flush with an IntegrityError. `flask rebuild-login-identifiers` rebuilds
+the table after raw SQL or bulk inserts that bypass the ORM; when old
+data clashes, the oldest account keeps the identifier.
+"""
+import click
+from sqlalchemy import event, select, insert, delete, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, User, LoginIdentifier
+from services.bulk import insert_ignoring_conflicts
+
+KINDS = ('username', 'email')
+
+# Users read per batch by rebuild_login_identifiers()
+CHUNK = 10000
+
+
+def normalize(value):
+    return (value or '').lower()
+
+
+def _rows(user):
+    rows = {}
+    for kind in KINDS:
+        identifier = normalize(getattr(user, kind))
+        # A username equal to the user's own email is stored once
+        if identifier and identifier not in rows:
+            rows[identifier] = {'identifier': identifier, 'user_id': user.id, 'kind': kind}
+    return list(rows.values())
+
+
+def find_user(identifier):
+    """The user whose username or email is `identifier`, ignoring case"""
+    return db.session.execute(
+        select(User).join(LoginIdentifier, LoginIdentifier.user_id == User.id)
+        .where(LoginIdentifier.identifier == normalize(identifier))
+    ).scalar_one_or_none()
+
+
+def taken(email, username):
+    """Which of ('email', 'username') already belong to an account, in one query"""
+    wanted = {'email': normalize(email), 'username': normalize(username)}
+    existing = set(db.session.execute(
+        select(LoginIdentifier.identifier).where(LoginIdentifier.identifier.in_(set(wanted.values())))
+    ).scalars())
+    return {kind for kind, identifier in wanted.items() if identifier in existing}
+
+
+def _after_flush(session, flush_context):
+    removed_ids = set()
+    added = []
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            added += _rows(obj)
+
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(get_history(obj, kind).has_changes() for kind in KINDS):
+            removed_ids.add(obj.id)
+            added += _rows(obj)
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            removed_ids.add(obj.id)
+
+    if removed_ids or added:
+        connection = session.connection()
+        table = LoginIdentifier.__table__
+        if removed_ids:
+            connection.execute(delete(table).where(table.c.user_id.in_(removed_ids)))
+        if added:
+            connection.execute(insert(table), added)
+
+
+def rebuild_login_identifiers():
+    """Recompute the table from users; returns the number of clashes skipped"""
+    table = LoginIdentifier.__table__
+    db.session.execute(delete(table))
+
+    # Lower-cased with normalize() rather than SQL lower(), which SQLite
+    # only applies to ASCII, so the rows match what find_user() looks up.
+    # Oldest users first: on a clash the oldest account keeps the identifier
+    users = db.session.execute(
+        select(User.id, User.username, User.email).order_by(User.id).execution_options(yield_per=CHUNK)
+    )
+    expected = 0
+    for chunk in users.partitions():
+        rows = [row for user in chunk for row in _rows(user)]
+        expected += len(rows)
+        if rows:
+            db.session.execute(insert_ignoring_conflicts(table), rows)
+    db.session.commit()
+
+    return expected - db.session.scalar(select(func.count()).select_from(table))
+
+
+def init_app(app):
+    """Register the maintenance hook and the rebuild command"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+    @app.cli.command('rebuild-login-identifiers')
+    def rebuild_login_identifiers_command():
+        """Recompute the lower-cased login identifiers from users."""
+        skipped = rebuild_login_identifiers()
+        click.echo('Login identifiers rebuilt')
+        if skipped:
+            click.echo(f'{skipped} usernames/emails clash with an older account ignoring case '
+                       'and cannot be used to sign in until changed')
@@ -0,0 +1,247 @@
+"""
+Notification email delivery
+When MAIL_SERVER is configured, new notifications are marked
+email_status='pending' (see services/notifications.py). The email worker
+(`flask email-worker`, see the Procfile) claims the due emails of up to
+MAIL_BATCH_SIZE recipients, folds each recipient's pending notifications
+into a single message, and sends the whole batch over one SMTP
+connection. Failed sends are retried with exponential backoff and marked
+'failed' after MAIL_MAX_ATTEMPTS. Each batch logs its throughput in
+messages/sec.
+
+Claiming is a conditional UPDATE like the outbox's, so several workers
+(or a restarted one) never send the same notification twice; emails a
+crashed worker left 'sending' are claimed again after CLAIM_TIMEOUT. For
+local testing point MAIL_SERVER at a debugging SMTP server, e.g.:
+
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false flask --app app email-worker
+"""
+import signal
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+import click
+from flask import current_app
+from sqlalchemy import select, update, func, or_, and_
+from models import db, User, Notification
+
+# Base retry delay; doubles with every failed attempt
+RETRY_BACKOFF = timedelta(seconds=60)
+
+# An email left 'sending' this long belongs to a dead worker
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def email_enabled():
+    return bool(current_app.config.get('MAIL_SERVER'))
+
+
+def _due(now):
+    """Pending emails whose retry time has come, or claims left by a dead worker"""
+    return or_(
+        and_(
+            Notification.email_status == 'pending',
+            or_(Notification.email_next_attempt_at.is_(None), Notification.email_next_attempt_at <= now)
+        ),
+        and_(Notification.email_status == 'sending', Notification.email_claimed_at < now - CLAIM_TIMEOUT)
+    )
+
+
+def _claim(worker_id, batch_size):
+    """
+    Mark the due emails of up to batch_size recipients as ours; return
+    them as {user: [notifications]}
+    """
+    now = datetime.utcnow()
+    # Oldest waiting recipients first
+    recipients = select(Notification.user_id).where(_due(now)).group_by(
+        Notification.user_id
+    ).order_by(func.min(Notification.id)).limit(batch_size)
+
+    # Re-checking `due` in the UPDATE makes the claim atomic: an email
+    # another worker claimed in the meantime no longer matches
+    db.session.execute(
+        update(Notification)
+        .where(Notification.user_id.in_(recipients.scalar_subquery()), _due(now))
+        .values(email_status='sending', email_claimed_by=worker_id, email_claimed_at=now),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    rows = db.session.query(Notification, User).join(
+        User, Notification.user_id == User.id
+    ).filter(
+        Notification.email_status == 'sending', Notification.email_claimed_by == worker_id
+    ).order_by(Notification.user_id, Notification.id).all()
+
+    batch = {}
+    for notification, user in rows:
+        batch.setdefault(user, []).append(notification)
+    return batch
+
+
+def build_message(user, notifications, sender):
+    """One email per recipient, covering all of their pending notifications"""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = user.email
+    if len(notifications) == 1:
+        message['Subject'] = notifications[0].title
+    else:
+        message['Subject'] = f'{len(notifications)} new notifications'
+
+    lines = [f'Dear {user.full_name},', '']
+    for notification in notifications:
+        lines += [notification.title, notification.message, '']
+    lines.append('Deeper Life Bible Church - Marriage Committee')
+    message.set_content('\n'.join(lines))
+    return message
+
+
+def _connect(config):
+    server = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT'])
+    if config['MAIL_USE_TLS']:
+        server.starttls()
+    if config['MAIL_USERNAME']:
+        server.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+    return server
+
+
+def _mark_sent(ids):
+    db.session.execute(
+        update(Notification).where(Notification.id.in_(ids))
+        .values(email_status='sent', emailed_at=datetime.utcnow(), email_claimed_by=None),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def _mark_failed(ids, max_attempts):
+    """Count a failed attempt; reschedule with backoff or give up"""
+    now = datetime.utcnow()
+    for notification in Notification.query.filter(Notification.id.in_(ids)):
+        notification.email_attempts += 1
+        notification.email_claimed_by = None
+        if notification.email_attempts >= max_attempts:
+            notification.email_status = 'failed'
+        else:
+            notification.email_status = 'pending'
+            notification.email_next_attempt_at = now + RETRY_BACKOFF * 2 ** (notification.email_attempts - 1)
+
+
+def send_batch(worker_id=None, batch_size=None):
+    """
+    Claim and send one batch of pending notification emails over one
+    connection. Returns (messages sent, messages failed).
+    """
+    config = current_app.config
+    worker_id = worker_id or uuid.uuid4().hex
+    batch = _claim(worker_id, batch_size or config['MAIL_BATCH_SIZE'])
+    if not batch:
+        return 0, 0
+
+    sender = config['MAIL_DEFAULT_SENDER']
+    sent_ids, failed_ids = [], []
+    sent = failed = 0
+    try:
+        server = _connect(config)
+    except (smtplib.SMTPException, OSError) as e:
+        current_app.logger.warning('SMTP connection failed: %s', e)
+        server = None
+
+    try:
+        for user, notifications in batch.items():
+            ids = [notification.id for notification in notifications]
+            if server is None:
+                failed_ids += ids
+                failed += 1
+                continue
+            try:
+                server.send_message(build_message(user, notifications, sender))
+                sent_ids += ids
+                sent += 1
+            except smtplib.SMTPServerDisconnected as e:
+                # The rest of the batch cannot go out on this connection
+                current_app.logger.warning('SMTP server disconnected: %s', e)
+                server = None
+                failed_ids += ids
+                failed += 1
+            except (smtplib.SMTPException, OSError) as e:
+                current_app.logger.warning('Email to %s failed: %s', user.email, e)
+                failed_ids += ids
+                failed += 1
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        # Recorded even if the batch was cut short, so what went out is
+        # not sent again when the claim expires
+        if sent_ids:
+            _mark_sent(sent_ids)
+        if failed_ids:
+            _mark_failed(failed_ids, config['MAIL_MAX_ATTEMPTS'])
+        db.session.commit()
+    return sent, failed
+
+
+def run_worker(app, batch_size=None, interval=5.0, once=False, log=None, stop=None):
+    """
+    Send pending emails until interrupted, until `stop` (a threading.Event)
+    is set, or until none are due with once=True
+    """
+    worker_id = uuid.uuid4().hex
+    stop = stop or threading.Event()
+    total_sent = total_failed = 0
+    started = time.perf_counter()
+    while not stop.is_set():
+        with app.app_context():
+            batch_started = time.perf_counter()
+            try:
+                sent, failed = send_batch(worker_id, batch_size)
+            except Exception:
+                if once:
+                    raise
+                app.logger.exception('Email batch failed')
+                sent = failed = 0
+            finally:
+                db.session.remove()
+            elapsed = time.perf_counter() - batch_started
+
+        total_sent += sent
+        total_failed += failed
+        if log and (sent or failed):
+            log(f'{sent} sent, {failed} failed in {elapsed:.2f}s ({sent / elapsed:.1f} messages/sec)')
+
+        if not (sent or failed):
+            if once:
+                break
+            stop.wait(interval)
+
+    if log:
+        elapsed = time.perf_counter() - started
+        log(f'Total: {total_sent} sent, {total_failed} failed in {elapsed:.2f}s '
+            f'({total_sent / elapsed if elapsed else 0:.1f} messages/sec)')
+    return total_sent, total_failed
+
+
+def init_app(app):
+    """Register the email worker command"""
+    @app.cli.command('email-worker')
+    @click.option('--once', is_flag=True, help='Exit once no emails are due.')
+    @click.option('--batch-size', default=None, type=int, help='Recipients per SMTP connection.')
+    @click.option('--interval', default=5.0, show_default=True, help='Seconds between polls when idle.')
+    def email_worker_command(once, batch_size, interval):
+        """Send pending notification emails in batches."""
+        if not app.config.get('MAIL_SERVER'):
+            raise click.ClickException('MAIL_SERVER is not configured')
+        click.echo(f"Email worker started ({app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']})")
+        # A deploy or restart sends SIGTERM: finish the batch in flight
+        # and record it before exiting
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        run_worker(app, batch_size=batch_size, interval=interval, once=once, log=click.echo, stop=stop)
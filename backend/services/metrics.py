@@ -0,0 +1,175 @@
+"""
+Prometheus metrics at GET /api/metrics
+Plain-text exposition format, built in-process without prometheus_client
+or any other service, so a local Prometheus (or just curl) can scrape it
+during load tests:
+
+- mc_http_requests_total and mc_http_request_duration_seconds, by blueprint
+- mc_db_pool_*: connection pool gauges and counters (services/pool_metrics.py)
+- mc_user_cache_*: user_loader cache hits, misses and size
+- mc_outbox_messages and mc_outbox_oldest_pending_seconds: outbox depth
+- mc_notification_stream_subscribers: open notification streams
+
+Counters are per process; with several gunicorn workers each scrape sees
+the worker that answered it. Set METRICS_TOKEN to require
+`Authorization: Bearer <token>`; without it the endpoint answers 404
+except in development and testing (METRICS_OPEN).
+"""
+import hmac
+import threading
+import time
+from flask import Response, current_app, g, request
+from services.outbox import queue_depth
+from services.pool_metrics import pool_stats
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestMetrics:
+    """Thread-safe request counters and latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.histograms = {}
+
+    def observe(self, blueprint, method, status, seconds):
+        with self._lock:
+            key = (blueprint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            buckets, total, count = self.histograms.get(blueprint, ([0] * len(BUCKETS), 0.0, 0))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self.histograms[blueprint] = (buckets, total + seconds, count + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.requests), {
+                blueprint: (list(buckets), total, count)
+                for blueprint, (buckets, total, count) in self.histograms.items()
+            }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Exposition:
+    """Collects samples and renders them in the text format"""
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """samples: [(labels dict, value)] or a single value"""
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            self.lines.append(f'{name}{_labels(**labels)} {value}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _request_metrics(out, metrics):
+    requests, histograms = metrics.snapshot()
+    out.metric('mc_http_requests_total', 'counter', 'HTTP requests handled by this process', [
+        ({'blueprint': blueprint, 'method': method, 'status': status}, count)
+        for (blueprint, method, status), count in sorted(requests.items())
+    ])
+
+    out.lines.append('# HELP mc_http_request_duration_seconds HTTP request latency')
+    out.lines.append('# TYPE mc_http_request_duration_seconds histogram')
+    for blueprint, (buckets, total, count) in sorted(histograms.items()):
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            out.lines.append(f'mc_http_request_duration_seconds_bucket{_labels(blueprint=blueprint, le=bound)} '
+                             f'{bucket_count}')
+        out.lines.append(f'mc_http_request_duration_seconds_bucket{_labels(blueprint=blueprint, le="+Inf")} {count}')
+        out.lines.append(f'mc_http_request_duration_seconds_sum{_labels(blueprint=blueprint)} {total:.6f}')
+        out.lines.append(f'mc_http_request_duration_seconds_count{_labels(blueprint=blueprint)} {count}')
+
+
+def _pool_metrics(out):
+    stats = pool_stats()
+    for key in ('size', 'checked_out', 'checked_in', 'overflow'):
+        if key in stats:
+            out.metric(f'mc_db_pool_{key}', 'gauge', f'Connection pool {key.replace("_", " ")}', stats[key])
+    out.metric('mc_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool', stats['checkouts'])
+    out.metric('mc_db_pool_checkout_wait_seconds_total', 'counter', 'Time spent waiting for a connection',
+               stats['wait_ms_total'] / 1000)
+    out.metric('mc_db_pool_timeouts_total', 'counter', 'Checkouts that timed out', stats['timeouts'])
+    out.metric('mc_db_pool_connections_opened_total', 'counter', 'Database connections opened',
+               stats['connections_opened'])
+    out.metric('mc_db_pool_connections_invalidated_total', 'counter', 'Connections discarded as broken or stale',
+               stats['connections_invalidated'])
+
+
+def _cache_metrics(out):
+    stats = current_app.extensions['user_cache'].stats()
+    out.metric('mc_user_cache_hits_total', 'counter', 'User loader cache hits', stats['hits'])
+    out.metric('mc_user_cache_misses_total', 'counter', 'User loader cache misses', stats['misses'])
+    out.metric('mc_user_cache_invalidations_total', 'counter', 'User loader cache invalidations',
+               stats['invalidations'])
+    out.metric('mc_user_cache_size', 'gauge', 'Users in the cache', stats['size'])
+    out.metric('mc_user_cache_hit_ratio', 'gauge', 'Hits over lookups since start', stats['hit_rate'] or 0)
+
+
+def _outbox_metrics(out):
+    counts, oldest = queue_depth()
+    out.metric('mc_outbox_messages', 'gauge', 'Unfinished outbox messages by status', [
+        ({'status': status}, count) for status, count in counts.items()
+    ])
+    out.metric('mc_outbox_oldest_pending_seconds', 'gauge', 'Age of the oldest pending outbox message',
+               round(oldest, 3))
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        # Fail closed: no token configured means no metrics in production
+        if not current_app.config.get('METRICS_OPEN'):
+            return Response('Not Found\n', status=404, content_type='text/plain')
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, content_type='text/plain')
+
+    out = Exposition()
+    _request_metrics(out, current_app.extensions['http_metrics'])
+    _pool_metrics(out)
+    _cache_metrics(out)
+    _outbox_metrics(out)
+    out.metric('mc_notification_stream_subscribers', 'gauge', 'Open notification streams',
+               current_app.extensions['notification_events'].subscriber_count())
+    return Response(out.render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app):
+    """Register the request hooks and the /api/metrics endpoint"""
+    metrics = RequestMetrics()
+    app.extensions['http_metrics'] = metrics
+
+    @app.before_request
+    def start_request_timer():
+        g.request_timer = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_timer', None)
+        if started is not None:
+            blueprint = request.blueprint or ('app' if request.endpoint else 'unmatched')
+            metrics.observe(blueprint, request.method, response.status_code, time.perf_counter() - started)
+        return response
+
+    app.add_url_rule('/api/metrics', 'metrics', metrics_view)
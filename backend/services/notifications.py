@@ -0,0 +1,273 @@
+"""
+Notification writes and bookkeeping
+Routes call queue_notification() / queue_notifications(), which go through
+the transactional outbox (services/outbox.py) so the request only writes
+one outbox row. The worker then calls create_notification(), or
+create_notifications() which fans the same notification out to every user
+a query selects in a fixed number of statements.
+
+Each user carries a denormalized `unread_notification_count` so the unread
+badge is read from the already-loaded user row instead of counting
+notifications. The counter is maintained from a Session after_flush hook,
+so every ORM insert, read-state change and delete keeps it in step; bulk
+statements (create_notifications(), mark_read(), delete_read(),
+delete_notification()) bypass the hook and adjust the counter themselves. `flask rebuild-unread-counts`
+recomputes the counters from scratch to repair drift.
+"""
+from datetime import datetime
+import click
+from sqlalchemy import event, select, func, insert, update, delete, literal, Integer, String
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, User, Notification
+from services import events
+from services.mailer import email_enabled
+from services.outbox import enqueue, enqueue_many, handler
+
+
+def _unread(read):
+    # NULL is neither read nor unread, matching filter_by(read=False)
+    return read is not None and not read
+
+
+def _old_value(obj, attr):
+    """Value of attr before the current flush"""
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+
+def adjust_unread_counts(connection, deltas):
+    """Add each {user_id: delta} to the users' unread counters"""
+    users = User.__table__
+    for user_id, delta in deltas.items():
+        if not delta or user_id is None:
+            continue
+        connection.execute(
+            update(users)
+            .where(users.c.id == user_id)
+            # Bookkeeping only: leave the profile's updated_at alone
+            .values(
+                unread_notification_count=users.c.unread_notification_count + delta,
+                updated_at=users.c.updated_at
+            )
+        )
+
+
+def _after_flush(session, flush_context):
+    deltas = {}
+
+    def bump(user_id, amount):
+        deltas[user_id] = deltas.get(user_id, 0) + amount
+
+    for obj in session.new:
+        if isinstance(obj, Notification) and _unread(obj.read):
+            bump(obj.user_id, 1)
+            events.publish(obj.user_id, obj.to_dict(), session=session)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Notification):
+            continue
+        if not any(get_history(obj, attr).has_changes() for attr in ('read', 'user_id')):
+            continue
+        if _unread(_old_value(obj, 'read')):
+            bump(_old_value(obj, 'user_id'), -1)
+        if _unread(obj.read):
+            bump(obj.user_id, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and _unread(_old_value(obj, 'read')):
+            bump(_old_value(obj, 'user_id'), -1)
+
+    if any(deltas.values()):
+        adjust_unread_counts(session.connection(), deltas)
+        for user_id, delta in deltas.items():
+            # New notifications were announced above with their content
+            if delta < 0:
+                events.publish(user_id, session=session)
+
+
+def mark_read(user_id, ids=None):
+    """
+    Mark a user's unread notifications read in one UPDATE.
+
+    Only the given ids when `ids` is provided, otherwise all of them.
+    Returns the number of notifications changed; the caller commits.
+    """
+    statement = update(Notification).where(
+        Notification.user_id == user_id,
+        Notification.read.is_(False)
+    )
+    if ids is not None:
+        statement = statement.where(Notification.id.in_(ids))
+    result = db.session.execute(
+        statement.values(read=True, read_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    adjust_unread_counts(db.session.connection(), {user_id: -result.rowcount})
+    if result.rowcount:
+        events.publish(user_id)
+    return result.rowcount
+
+
+def delete_read(user_id, older_than):
+    """
+    Delete a user's read notifications created before `older_than` in one
+    DELETE. Returns the number deleted; the caller commits.
+    """
+    result = db.session.execute(
+        delete(Notification).where(
+            Notification.user_id == user_id,
+            Notification.read.is_(True),
+            Notification.created_at < older_than
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
+
+
+def delete_notification(user_id, notification_id):
+    """
+    Delete one of a user's notifications in one DELETE ... RETURNING. Of
+    two concurrent deletes only one gets the row back, so the unread
+    counter is adjusted once. Returns True if it was deleted; the caller
+    commits.
+    """
+    row = db.session.execute(
+        delete(Notification).where(
+            Notification.id == notification_id,
+            Notification.user_id == user_id
+        ).returning(Notification.read),
+        execution_options={'synchronize_session': False}
+    ).first()
+    if row is None:
+        return False
+    if _unread(row.read):
+        adjust_unread_counts(db.session.connection(), {user_id: -1})
+        events.publish(user_id)
+    return True
+
+
+def _email_status():
+    """New notifications are emailed (by services/mailer.py) when mail is configured"""
+    return 'pending' if email_enabled() else None
+
+
+def create_notification(user_id, title, message, notification_type, application_id=None):
+    """Create a notification for a user"""
+    notification = Notification(
+        user_id=user_id,
+        application_id=application_id,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        email_status=_email_status()
+    )
+    db.session.add(notification)
+    return notification
+
+
+def create_notifications(recipients, title, message, notification_type, application_id=None):
+    """
+    Fan the same notification out to every user id selected by `recipients`.
+
+    recipients is a select() of User.id. The rows are written with one
+    INSERT ... SELECT and the counters with one UPDATE, however many users
+    match, so nothing is loaded into the session. Returns the number of
+    notifications created; the caller commits.
+    """
+    notifications = Notification.__table__
+    users = User.__table__
+    recipients = recipients.subquery()
+
+    # Rows added to the session so far (e.g. the application these
+    # notifications point at) must exist before the INSERT ... SELECT
+    db.session.flush()
+    result = db.session.execute(insert(notifications).from_select(
+        ['user_id', 'application_id', 'title', 'message', 'notification_type', 'read',
+         'email_status', 'email_attempts', 'created_at'],
+        select(
+            recipients.c.id,
+            literal(application_id, Integer),
+            literal(title),
+            literal(message),
+            literal(notification_type),
+            literal(False),
+            literal(_email_status(), String),
+            literal(0),
+            literal(datetime.utcnow())
+        )
+    ))
+    db.session.execute(
+        update(users)
+        .where(users.c.id.in_(select(recipients.c.id)))
+        .values(
+            unread_notification_count=users.c.unread_notification_count + 1,
+            updated_at=users.c.updated_at
+        )
+    )
+    events.publish_all(select(recipients.c.id))
+    return result.rowcount
+
+
+def queue_notification(user_id, title, message, notification_type, application_id=None):
+    """Queue a notification for a user; the outbox worker writes it after commit"""
+    enqueue('notification', user_id=user_id, title=title, message=message,
+            notification_type=notification_type, application_id=application_id)
+
+
+def queue_notifications(recipients, title, message, notification_type, application_id=None):
+    """
+    Queue a fan-out to every user matching `recipients`, a dict of User
+    column filters (e.g. {'role': 'committee_member', 'region': ...}).
+    Recipients are resolved when the worker runs, not in the request.
+    """
+    enqueue('notification', recipients=recipients, title=title, message=message,
+            notification_type=notification_type, application_id=application_id)
+
+
+def queue_application_notifications(applications, title, message, notification_type):
+    """Queue the same notification to each application's applicant, in one INSERT"""
+    enqueue_many('notification', [
+        {'user_id': application.applicant_id, 'title': title, 'message': message,
+         'notification_type': notification_type, 'application_id': application.id}
+        for application in applications
+    ])
+
+
+@handler('notification')
+def _deliver_notification(title, message, notification_type, application_id=None,
+                          user_id=None, recipients=None):
+    if recipients is not None:
+        create_notifications(db.select(User.id).filter_by(**recipients),
+                             title, message, notification_type, application_id)
+    else:
+        create_notification(user_id, title, message, notification_type, application_id)
+
+
+def rebuild_unread_counts():
+    """Recompute every user's unread counter from the notifications table"""
+    users = User.__table__
+    unread = select(func.count(Notification.id)).where(
+        Notification.user_id == users.c.id,
+        Notification.read.is_(False)
+    ).scalar_subquery()
+    db.session.execute(
+        update(users).values(unread_notification_count=unread, updated_at=users.c.updated_at)
+    )
+    db.session.commit()
+
+
+def init_app(app):
+    """Register the maintenance hook and the rebuild command"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+    @app.cli.command('rebuild-unread-counts')
+    def rebuild_unread_counts_command():
+        """Recompute users' unread notification counters."""
+        rebuild_unread_counts()
+        click.echo('Unread counts rebuilt')
@@ -0,0 +1,204 @@
+"""
+Transactional outbox
+Routes call enqueue() to record a side effect (a notification to write, an
+email to send) in the same transaction as the change that caused it; the
+request then commits once and returns. A worker claims pending messages
+from the outbox_messages table and runs the registered handler for each,
+retrying failures with exponential backoff.
+
+The worker runs as its own process (`flask outbox-worker`, see the
+Procfile) or, when OUTBOX_INLINE_WORKER is set, as a daemon thread inside
+each web process. Claiming is a conditional UPDATE, so any number of
+workers can share the table without processing a message twice.
+"""
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import select, insert, update, func, or_, and_
+from models import db, OutboxMessage
+
+MAX_ATTEMPTS = 5
+
+# Base retry delay; doubles with every failed attempt
+RETRY_BACKOFF = timedelta(seconds=30)
+
+# A message left 'processing' this long belongs to a dead worker
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+_handlers = {}
+
+
+def handler(kind):
+    """Register the function that processes messages of `kind`"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, **payload):
+    """Queue a message in the current session; it is sent when the caller commits"""
+    message = OutboxMessage(kind=kind, payload=json.dumps(payload))
+    db.session.add(message)
+    return message
+
+
+def enqueue_many(kind, payloads):
+    """Queue one message per payload with a single INSERT; sent when the caller commits"""
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(OutboxMessage.__table__), [
+        {'kind': kind, 'payload': json.dumps(payload), 'status': 'pending', 'attempts': 0,
+         'available_at': now, 'created_at': now}
+        for payload in payloads
+    ])
+
+
+def queue_depth():
+    """({status: count} of unfinished messages, age in seconds of the oldest pending one)"""
+    rows = db.session.execute(
+        select(OutboxMessage.status, func.count(OutboxMessage.id), func.min(OutboxMessage.available_at))
+        .where(OutboxMessage.status.in_(('pending', 'processing', 'failed')))
+        .group_by(OutboxMessage.status)
+    ).all()
+    counts = {status: 0 for status in ('pending', 'processing', 'failed')}
+    oldest = None
+    for status, count, available_at in rows:
+        counts[status] = count
+        if status == 'pending':
+            oldest = available_at
+    age = max((datetime.utcnow() - oldest).total_seconds(), 0) if oldest else 0
+    return counts, age
+
+
+def _claim(worker_id, batch_size):
+    """Mark up to batch_size due messages as ours; return them"""
+    now = datetime.utcnow()
+    due = or_(
+        and_(OutboxMessage.status == 'pending', OutboxMessage.available_at <= now),
+        and_(OutboxMessage.status == 'processing', OutboxMessage.claimed_at < now - CLAIM_TIMEOUT)
+    )
+    candidates = select(OutboxMessage.id).where(due).order_by(OutboxMessage.id).limit(batch_size)
+
+    # Re-checking `due` in the UPDATE makes the claim atomic: a message
+    # another worker claimed in the meantime no longer matches
+    db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(candidates.scalar_subquery()), due)
+        .values(status='processing', claimed_by=worker_id, claimed_at=now),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    return OutboxMessage.query.filter_by(
+        status='processing', claimed_by=worker_id
+    ).order_by(OutboxMessage.id).all()
+
+
+def _fail(message_id, error):
+    message = db.session.get(OutboxMessage, message_id)
+    message.attempts += 1
+    message.last_error = f'{type(error).__name__}: {error}'[:2000]
+    message.claimed_by = None
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = 'failed'
+    else:
+        message.status = 'pending'
+        message.available_at = datetime.utcnow() + RETRY_BACKOFF * 2 ** (message.attempts - 1)
+    db.session.commit()
+
+
+def process_batch(worker_id=None, batch_size=100):
+    """
+    Claim and process one batch of due messages.
+
+    Each message is committed on its own so a failing handler only
+    rolls back its own work. Returns (processed, failed).
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    processed = failed = 0
+    for message in _claim(worker_id, batch_size):
+        message_id = message.id
+        try:
+            func = _handlers.get(message.kind)
+            if func is None:
+                raise LookupError(f'no outbox handler for {message.kind!r}')
+            func(**json.loads(message.payload))
+            message.status = 'done'
+            message.processed_at = datetime.utcnow()
+            db.session.commit()
+            processed += 1
+        except Exception as e:
+            db.session.rollback()
+            _fail(message_id, e)
+            failed += 1
+    return processed, failed
+
+
+def run_worker(app, batch_size=100, interval=1.0, once=False, log=None):
+    """Process the outbox until interrupted (or until it is empty with once=True)"""
+    worker_id = uuid.uuid4().hex
+    while True:
+        with app.app_context():
+            try:
+                processed, failed = process_batch(worker_id, batch_size)
+            except Exception:
+                if once:
+                    raise
+                # e.g. the database is briefly unreachable; try again later
+                app.logger.exception('Outbox batch failed')
+                processed = failed = 0
+            finally:
+                db.session.remove()
+        if log and (processed or failed):
+            log(f'{processed} processed, {failed} failed')
+        if processed + failed < batch_size:
+            if once:
+                return
+            time.sleep(interval)
+
+
+def _start_inline_worker(app):
+    thread = threading.Thread(
+        target=run_worker,
+        args=(app,),
+        kwargs={'interval': app.config['OUTBOX_POLL_INTERVAL']},
+        name='outbox-worker',
+        daemon=True
+    )
+    thread.start()
+
+
+def init_app(app):
+    """Register the worker command and, if configured, the in-process worker"""
+    # Import for their @handler registrations
+    from services import notifications  # noqa: F401
+
+    @app.cli.command('outbox-worker')
+    @click.option('--once', is_flag=True, help='Exit once the outbox is empty.')
+    @click.option('--batch-size', default=100, show_default=True)
+    @click.option('--interval', default=None, type=float, help='Seconds between polls when idle.')
+    def outbox_worker_command(once, batch_size, interval):
+        """Process queued notifications and other outbox messages."""
+        interval = interval if interval is not None else app.config['OUTBOX_POLL_INTERVAL']
+        click.echo(f'Outbox worker started (batch {batch_size}, poll every {interval}s)')
+        run_worker(app, batch_size=batch_size, interval=interval, once=once, log=click.echo)
+
+    if app.config.get('OUTBOX_INLINE_WORKER'):
+        lock = threading.Lock()
+        started = []
+
+        # Started lazily so CLI commands (migrations, the external worker)
+        # never spawn it
+        @app.before_request
+        def start_inline_worker():
+            if started:
+                return
+            with lock:
+                if not started:
+                    started.append(True)
+                    _start_inline_worker(app)
@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination
+Opt-in alternative to query.paginate(): instead of COUNT(*) plus an OFFSET
+scan, each page is fetched with a WHERE clause on the sort key of the last
+row seen, so deep pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_, DateTime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a ?cursor= value cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(expression, value):
+    if value is not None and isinstance(expression.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError('cursor does not match sort keys')
+        return [_decode_value(expression, value) for (expression, _), value in zip(keys, values)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def _after(keys, values):
+    """WHERE clause selecting rows that sort strictly after `values`"""
+    clauses = []
+    for i, (expression, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        beyond = expression < values[i] if descending else expression > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=20):
+    """
+    Fetch one page of `query` ordered by `keys`.
+
+    keys is a list of (expression, descending) pairs that must end with a
+    unique column (normally the primary key) and must not contain NULLs -
+    wrap nullable columns in coalesce(). Returns (items, next_cursor);
+    next_cursor is None on the last page.
+    """
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+
+    query = query.order_by(*[
+        expression.desc() if descending else expression.asc()
+        for expression, descending in keys
+    ])
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.add_columns(*[expression for expression, _ in keys]).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1:])
+
+    return [row[0] for row in rows], next_cursor
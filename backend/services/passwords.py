@@ -0,0 +1,163 @@
+"""
+Password hashing policy
+PASSWORD_HASH_METHOD sets the algorithm and cost of new password hashes:
+- 'pbkdf2:sha256[:iterations]' or 'scrypt[:n:r:p]' (Werkzeug)
+- 'argon2[:time_cost:memory_cost_kib:parallelism]' when argon2-cffi is
+  installed
+
+Hashes made with any of these keep verifying after the policy changes;
+login rehashes a user's password (needs_rehash) once it sees a hash made
+with other parameters, so the whole table migrates as people log in.
+
+Hashing is CPU-bound by design. It runs in a pool of
+PASSWORD_HASH_WORKERS threads per process (hashlib and argon2 release the
+GIL), so a login storm occupies at most that many cores while the
+process keeps serving other requests. Up to PASSWORD_HASH_QUEUE more
+hashes may wait for a thread; beyond that PasswordHashingBusy is raised
+and the request gets a 503 instead of piling up. Under gevent, where
+threads are greenlets, the pool is made of gevent's real OS threads.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, jsonify
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+try:
+    import argon2
+except ImportError:  # optional dependency
+    argon2 = None
+
+# Werkzeug's scrypt defaults (n, r, p)
+SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+
+def _gevent_threadpool(workers):
+    """A pool of OS threads if gevent has turned threading into greenlets"""
+    try:
+        from gevent import monkey
+        from gevent.threadpool import ThreadPool
+    except ImportError:
+        return None
+    if not monkey.is_module_patched('threading'):
+        return None
+    return ThreadPool(workers)
+
+
+class PasswordHashingBusy(Exception):
+    """Every hashing thread is busy and the wait queue is full"""
+
+
+def _normalize(method):
+    """The method prefix Werkzeug writes into hashes made with `method`"""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        digest = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else str(DEFAULT_PBKDF2_ITERATIONS)
+        return f'pbkdf2:{digest}:{iterations}'
+    if parts[0] == 'scrypt':
+        return ':'.join(['scrypt', *(parts[1:] or SCRYPT_DEFAULTS)])
+    raise ValueError(f'Unsupported PASSWORD_HASH_METHOD {method!r}')
+
+
+def _argon2_hasher(method):
+    if argon2 is None:
+        raise RuntimeError('PASSWORD_HASH_METHOD=argon2 requires the argon2-cffi package')
+    params = {}
+    for name, value in zip(('time_cost', 'memory_cost', 'parallelism'), method.split(':')[1:]):
+        params[name] = int(value)
+    return argon2.PasswordHasher(**params)
+
+
+class PasswordPolicy:
+    """Hashes and verifies passwords on a bounded thread pool"""
+
+    def __init__(self, method='pbkdf2:sha256', workers=2, queue=16):
+        self.method = method
+        self.workers = workers
+        if method.split(':')[0] == 'argon2':
+            self._argon2 = _argon2_hasher(method)
+            self._prefix = None
+        else:
+            self._argon2 = None
+            self._prefix = _normalize(method)
+        gevent_pool = _gevent_threadpool(workers)
+        if gevent_pool is not None:
+            self._call = lambda func, *args: gevent_pool.spawn(func, *args).get()
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            self._call = lambda func, *args: executor.submit(func, *args).result()
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            return self._call(func, *args)
+        finally:
+            self._slots.release()
+
+    def _hash(self, password):
+        if self._argon2 is not None:
+            return self._argon2.hash(password)
+        return generate_password_hash(password, method=self._prefix)
+
+    def _verify(self, password_hash, password):
+        if password_hash.startswith('$argon2'):
+            try:
+                return (self._argon2 or argon2.PasswordHasher()).verify(password_hash, password)
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+                return False
+        return check_password_hash(password_hash, password)
+
+    def hash(self, password):
+        return self._run(self._hash, password)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        if password_hash.startswith('$argon2') and argon2 is None:
+            current_app.logger.warning('argon2 password hash found but argon2-cffi is not installed')
+            return False
+        return self._run(self._verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if password_hash was not made with the current policy"""
+        if self._argon2 is not None:
+            if not password_hash.startswith('$argon2'):
+                return True
+            return self._argon2.check_needs_rehash(password_hash)
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def stats(self):
+        return {'method': self._prefix or self.method, 'workers': self.workers}
+
+
+def password_policy():
+    return current_app.extensions['password_policy']
+
+
+def hash_password(password):
+    return password_policy().hash(password)
+
+
+def verify_password(password_hash, password):
+    return password_policy().verify(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return password_policy().needs_rehash(password_hash)
+
+
+def init_app(app):
+    """Create the hashing policy and the 503 handler for a full queue"""
+    app.extensions['password_policy'] = PasswordPolicy(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue=app.config['PASSWORD_HASH_QUEUE']
+    )
+
+    @app.errorhandler(PasswordHashingBusy)
+    def password_hashing_busy(error):
+        response = jsonify({'error': 'Too many sign-ins in progress, please try again'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
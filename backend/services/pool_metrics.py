@@ -0,0 +1,117 @@
+"""
+Database connection pool metrics
+Reports, per process, how many connections are open, checked out and in
+overflow, how long requests waited to get one, and how many were
+replaced (e.g. by pool_pre_ping finding a stale connection). Shown at
+GET /api/admin/diagnostics; tune the pool with the DB_* settings in
+config.py.
+
+The counters come from a QueuePool subclass that times every checkout
+(including opening a new connection), so init_app must run before
+db.init_app creates the engine. SQLite in-memory databases keep their
+own pool and report no counters.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from models import db
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self, pool):
+        with self._lock:
+            stats = {
+                'pool': type(pool).__name__,
+                'checkouts': self.checkouts,
+                'wait_ms_avg': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else None,
+                'wait_ms_max': round(self.wait_max * 1000, 3),
+                'wait_ms_total': round(self.wait_total * 1000, 3),
+                'timeouts': self.timeouts,
+                'connections_opened': self.connects,
+                'connections_invalidated': self.invalidations
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        return stats
+
+
+def timed_pool_class(metrics):
+    """A QueuePool that reports checkouts and reconnects to `metrics`"""
+    def on_connect(dbapi_connection, connection_record):
+        metrics.record_connect()
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidation()
+
+    class TimedQueuePool(QueuePool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # engine.dispose() builds a new pool that inherits the listeners
+            if on_connect not in self.dispatch.connect:
+                event.listen(self, 'connect', on_connect)
+                event.listen(self, 'invalidate', on_invalidate)
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeout:
+                metrics.record_timeout()
+                raise
+            metrics.record_wait(time.perf_counter() - start)
+            return connection
+
+    return TimedQueuePool
+
+
+def pool_stats():
+    return current_app.extensions['pool_metrics'].stats(db.engine.pool)
+
+
+def init_app(app):
+    """Install the timed pool; call before db.init_app"""
+    metrics = PoolMetrics()
+    app.extensions['pool_metrics'] = metrics
+
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    in_memory = uri in ('sqlite://', 'sqlite:///:memory:')
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if not in_memory and 'poolclass' not in options:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, 'poolclass': timed_pool_class(metrics)}
@@ -0,0 +1,115 @@
+"""
+Per-request SQL and timing instrumentation (opt-in: REQUEST_INSTRUMENTATION)
+Engine cursor events count each request's queries, their total time and
+the slowest statement. Every response then carries a Server-Timing header
+(visible in the browser's network panel):
+
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=3.1, total;dur=15.5
+
+and one JSON log line per request goes to the `services.request_metrics`
+logger. Requests running more than REQUEST_QUERY_BUDGET statements are
+logged as warnings with "over_budget": true, which is how N+1 loops show
+up. Statements run outside a request (CLI commands, workers) are ignored.
+"""
+import json
+import logging
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept in the log line
+MAX_STATEMENT = 300
+
+
+class RequestStats:
+    """SQL statements executed while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+
+
+def _stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _stats() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats()
+    if stats is not None and conn.info.get('query_started'):
+        stats.record(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+def _server_timing(stats, total):
+    return ', '.join([
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} {"query" if stats.queries == 1 else "queries"}"',
+        f'app;dur={max(total - stats.db_time, 0) * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}'
+    ])
+
+
+def init_app(app):
+    """Register the engine listeners and request hooks when enabled"""
+    if not app.config.get('REQUEST_INSTRUMENTATION'):
+        return
+
+    budget = app.config['REQUEST_QUERY_BUDGET']
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        response.headers['Server-Timing'] = _server_timing(stats, total)
+
+        over_budget = stats.queries > budget
+        statement = stats.slowest_statement
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'slowest_ms': round(stats.slowest * 1000, 2),
+            'slowest_statement': ' '.join(statement.split())[:MAX_STATEMENT] if statement else None,
+            'query_budget': budget,
+            'over_budget': over_budget
+        }))
+        return response
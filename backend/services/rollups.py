@@ -0,0 +1,247 @@
+"""
+Materialized rollups of application and user counts
+
+Read endpoints (dashboard, committee statistics, admin overview and
+regional statistics) sum these small tables instead of scanning the raw
+applications and users tables. The rollups are maintained incrementally
+from a Session after_flush hook, so every ORM write keeps them in step;
+`flask rebuild-rollups` recomputes them from scratch to repair drift
+(e.g. after raw SQL or bulk inserts that bypass the ORM unit of work).
+
+Each row is unique on group_key, its grouping columns encoded as one
+value, and a flush applies all of its deltas with one INSERT ... ON
+CONFLICT DO UPDATE SET count = count + excluded.count, so concurrent
+writers adding the same new key merge into one row.
+"""
+import json
+import click
+from sqlalchemy import event, select, func, insert, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import get_history
+from models import db, Application, User, ApplicationRollup, UserRollup
+from services.bulk import insert_or_increment
+
+APPLICATION_KEY = ('region', 'applicant_role', 'applicant_active', 'status', 'current_stage')
+USER_KEY = ('region', 'division', 'gender', 'role', 'is_active')
+
+# User attributes that determine which application rollup row an
+# application is counted in
+APPLICANT_ATTRS = ('region', 'role', 'is_active')
+
+
+def _bool(value):
+    return None if value is None else bool(value)
+
+
+def _old_value(obj, attr):
+    """Value of attr before the current flush"""
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+
+def _user_key(values):
+    return (values['region'], values['division'], values['gender'],
+            values['role'], _bool(values['is_active']))
+
+
+def _application_key(applicant, status, stage):
+    region, role, is_active = applicant
+    return (region, role, _bool(is_active), status, stage)
+
+
+def _group_key(key):
+    return json.dumps(list(key), separators=(',', ':'))
+
+
+def _key_filter(model, fields, key):
+    conditions = []
+    for field, value in zip(fields, key):
+        column = getattr(model, field)
+        conditions.append(column.is_(None) if value is None else column == value)
+    return conditions
+
+
+def _rollup_row(fields, key, count):
+    row = dict(zip(fields, key))
+    row['group_key'] = _group_key(key)
+    row['count'] = count
+    return row
+
+
+def _apply_deltas(connection, model, fields, deltas):
+    """Add each delta to its rollup row, inserting the row if it is missing"""
+    rows = [_rollup_row(fields, key, delta) for key, delta in deltas.items() if delta]
+    if rows:
+        connection.execute(insert_or_increment(model.__table__, ['group_key'], 'count', bind=connection), rows)
+
+
+def _after_flush(session, flush_context):
+    app_deltas = {}
+    user_deltas = {}
+    handled_application_ids = set()
+    connection = None
+
+    def bump(deltas, key, amount):
+        deltas[key] = deltas.get(key, 0) + amount
+
+    def applicant_for(application):
+        """(old, new) applicant attributes for an application's applicant"""
+        nonlocal connection
+        applicant = session.identity_map.get(identity_key(User, application.applicant_id))
+        if applicant is not None:
+            old = tuple(_old_value(applicant, attr) for attr in APPLICANT_ATTRS)
+            return old, tuple(getattr(applicant, attr) for attr in APPLICANT_ATTRS)
+        connection = connection or session.connection()
+        row = connection.execute(
+            select(User.region, User.role, User.is_active).where(User.id == application.applicant_id)
+        ).first()
+        values = tuple(row) if row else (None, None, None)
+        return values, values
+
+    for obj in session.new:
+        if isinstance(obj, Application):
+            handled_application_ids.add(obj.id)
+            _, applicant = applicant_for(obj)
+            bump(app_deltas, _application_key(applicant, obj.status, obj.current_stage), 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Application):
+            if not any(get_history(obj, attr).has_changes() for attr in ('status', 'current_stage')):
+                continue
+            handled_application_ids.add(obj.id)
+            old_applicant, applicant = applicant_for(obj)
+            bump(app_deltas, _application_key(
+                old_applicant, _old_value(obj, 'status'), _old_value(obj, 'current_stage')), -1)
+            bump(app_deltas, _application_key(applicant, obj.status, obj.current_stage), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            handled_application_ids.add(obj.id)
+            old_applicant, _ = applicant_for(obj)
+            bump(app_deltas, _application_key(
+                old_applicant, _old_value(obj, 'status'), _old_value(obj, 'current_stage')), -1)
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            bump(user_deltas, _user_key({f: getattr(obj, f) for f in USER_KEY}), 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        if not any(get_history(obj, attr).has_changes() for attr in USER_KEY):
+            continue
+        bump(user_deltas, _user_key({f: _old_value(obj, f) for f in USER_KEY}), -1)
+        bump(user_deltas, _user_key({f: getattr(obj, f) for f in USER_KEY}), 1)
+
+        # Moving an applicant moves the rest of their applications with them
+        if any(get_history(obj, attr).has_changes() for attr in APPLICANT_ATTRS):
+            old_applicant = tuple(_old_value(obj, attr) for attr in APPLICANT_ATTRS)
+            new_applicant = tuple(getattr(obj, attr) for attr in APPLICANT_ATTRS)
+            connection = connection or session.connection()
+            rows = connection.execute(
+                select(Application.status, Application.current_stage, func.count(Application.id))
+                .where(Application.applicant_id == obj.id)
+                .where(Application.id.notin_(handled_application_ids))
+                .group_by(Application.status, Application.current_stage)
+            ).all()
+            for status, stage, count in rows:
+                bump(app_deltas, _application_key(old_applicant, status, stage), -count)
+                bump(app_deltas, _application_key(new_applicant, status, stage), count)
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            bump(user_deltas, _user_key({f: _old_value(obj, f) for f in USER_KEY}), -1)
+
+    if app_deltas or user_deltas:
+        connection = connection or session.connection()
+        _apply_deltas(connection, ApplicationRollup, APPLICATION_KEY, app_deltas)
+        _apply_deltas(connection, UserRollup, USER_KEY, user_deltas)
+
+
+def rebuild_rollups():
+    """Recompute both rollup tables from the raw tables"""
+    db.session.execute(delete(ApplicationRollup))
+    db.session.execute(delete(UserRollup))
+
+    application_rows = select(
+        User.region,
+        User.role,
+        User.is_active,
+        Application.status,
+        Application.current_stage,
+        func.count(Application.id)
+    ).select_from(Application).outerjoin(
+        User, Application.applicant_id == User.id
+    ).group_by(
+        User.region, User.role, User.is_active, Application.status, Application.current_stage
+    )
+    # One row per key, so the (small) result is keyed in Python
+    rows = [
+        _rollup_row(APPLICATION_KEY, _application_key((region, role, is_active), status, stage), count)
+        for region, role, is_active, status, stage, count in db.session.execute(application_rows)
+    ]
+    if rows:
+        db.session.execute(insert(ApplicationRollup), rows)
+
+    user_rows = select(
+        User.region, User.division, User.gender, User.role, User.is_active, func.count(User.id)
+    ).group_by(User.region, User.division, User.gender, User.role, User.is_active)
+    rows = [
+        _rollup_row(USER_KEY, _user_key(dict(zip(USER_KEY, row[:-1]))), row[-1])
+        for row in db.session.execute(user_rows)
+    ]
+    if rows:
+        db.session.execute(insert(UserRollup), rows)
+
+    db.session.commit()
+
+
+def init_app(app):
+    """Register the maintenance hook and the rebuild command"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Recompute application and user rollups from the raw tables."""
+        rebuild_rollups()
+        click.echo('Rollups rebuilt')
+
+
+# ---------------------------------------------------------------------------
+# Read helpers
+# ---------------------------------------------------------------------------
+
+def application_rollup_rows(*group_by, region=None, scoped=False, **filters):
+    """
+    Sum application rollups grouped by the given key columns.
+
+    When scoped is true, only applications whose applicant is in `region`
+    are counted (region=None then means applicants without a region,
+    matching `User.region == None`).
+    """
+    columns = [getattr(ApplicationRollup, name) for name in group_by]
+    query = db.session.query(*columns, func.sum(ApplicationRollup.count))
+    if scoped:
+        query = query.filter(*_key_filter(ApplicationRollup, ['region'], [region]))
+    for name, value in filters.items():
+        query = query.filter(getattr(ApplicationRollup, name) == value)
+    if columns:
+        query = query.group_by(*columns)
+    return [tuple(row[:-1]) + (int(row[-1] or 0),) for row in query.all()]
+
+
+def user_rollup_rows(*group_by, **filters):
+    """Sum user rollups grouped by the given key columns"""
+    columns = [getattr(UserRollup, name) for name in group_by]
+    query = db.session.query(*columns, func.sum(UserRollup.count))
+    for name, value in filters.items():
+        query = query.filter(getattr(UserRollup, name) == value)
+    if columns:
+        query = query.group_by(*columns)
+    return [tuple(row[:-1]) + (int(row[-1] or 0),) for row in query.all()]
@@ -0,0 +1,177 @@
+"""
+Application search
+Substring search over applicant name, partner name and application number
+that can use an index instead of scanning the applications/users join.
+
+- PostgreSQL: pg_trgm GIN indexes on the three columns; ILIKE '%term%'
+  is answered from the indexes and results are ranked by similarity().
+- SQLite: an FTS5 shadow table (trigram tokenizer) keyed by application
+  id, kept in sync by triggers on applications and users, ranked by bm25.
+
+Other databases, and terms shorter than one trigram, fall back to the
+plain ILIKE match. `flask rebuild-search-index` repopulates the SQLite
+shadow table.
+"""
+import sqlite3
+import click
+from sqlalchemy import event, select, func, literal, text, union_all, Float, Integer
+from sqlalchemy.schema import DDL
+from models import db, Application, User
+
+SEARCH_TABLE = 'application_search'
+
+# Trigram indexes cannot help with shorter terms
+MIN_INDEXED_LENGTH = 3
+
+_SEARCH_ROW = (
+    "SELECT applications.id, users.full_name, applications.partner_name, applications.application_number "
+    "FROM applications LEFT OUTER JOIN users ON users.id = applications.applicant_id"
+)
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "applicant_name, partner_name, application_number, tokenize='trigram')",
+
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON applications BEGIN "
+    f"INSERT INTO {SEARCH_TABLE} (rowid, applicant_name, partner_name, application_number) "
+    "SELECT NEW.id, (SELECT full_name FROM users WHERE id = NEW.applicant_id), "
+    "NEW.partner_name, NEW.application_number; "
+    "END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au "
+    "AFTER UPDATE OF applicant_id, partner_name, application_number ON applications BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id; "
+    f"INSERT INTO {SEARCH_TABLE} (rowid, applicant_name, partner_name, application_number) "
+    "SELECT NEW.id, (SELECT full_name FROM users WHERE id = NEW.applicant_id), "
+    "NEW.partner_name, NEW.application_number; "
+    "END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON applications BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id; "
+    "END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_user_au AFTER UPDATE OF full_name ON users BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id FROM applications WHERE applicant_id = NEW.id); "
+    f"INSERT INTO {SEARCH_TABLE} (rowid, applicant_name, partner_name, application_number) "
+    "SELECT id, NEW.full_name, partner_name, application_number FROM applications "
+    "WHERE applicant_id = NEW.id; "
+    "END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_applications_partner_name_trgm "
+    "ON applications USING gin (partner_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_applications_number_trgm "
+    "ON applications USING gin (application_number gin_trgm_ops)",
+]
+
+
+def fts_supported(dialect_name):
+    """FTS5's trigram tokenizer needs SQLite 3.34+"""
+    return dialect_name == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _create_sqlite_index(target, connection, **kw):
+    if fts_supported(connection.dialect.name):
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def _drop_sqlite_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+_create_postgres_indexes = [
+    DDL(statement).execute_if(dialect='postgresql') for statement in POSTGRES_DDL
+]
+
+
+def _like_matches(term, ranked):
+    """(application_id, rank) for every application matching ILIKE '%term%'
+
+    One branch per column so each can use its own index; the rank is the
+    best pg_trgm similarity across the columns that matched.
+    """
+    pattern = f'%{term}%'
+
+    def rank(column):
+        return func.similarity(column, term) if ranked else literal(0.0)
+
+    branches = union_all(
+        select(Application.id.label('application_id'), rank(User.full_name).label('rank'))
+        .join(User, Application.applicant_id == User.id)
+        .where(User.full_name.ilike(pattern)),
+        select(Application.id, rank(Application.partner_name))
+        .where(Application.partner_name.ilike(pattern)),
+        select(Application.id, rank(Application.application_number))
+        .where(Application.application_number.ilike(pattern)),
+    ).subquery()
+
+    return select(
+        branches.c.application_id,
+        func.max(branches.c.rank).label('rank')
+    ).group_by(branches.c.application_id).subquery('search_matches')
+
+
+def _fts_matches(term):
+    """(application_id, rank) from the FTS5 shadow table; a quoted phrase is a substring match"""
+    phrase = '"' + term.replace('"', '""') + '"'
+    return text(
+        f"SELECT rowid AS application_id, -bm25({SEARCH_TABLE}) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :phrase"
+    ).bindparams(phrase=phrase).columns(
+        application_id=Integer, rank=Float
+    ).subquery('search_matches')
+
+
+def search_matches(term):
+    """
+    Subquery of (application_id, rank) for applications matching `term`.
+
+    Higher rank is a better match; join it to Application.id and order by
+    its rank column.
+    """
+    term = term.strip()
+    dialect = db.session.get_bind().dialect.name
+    if len(term) < MIN_INDEXED_LENGTH:
+        return _like_matches(term, ranked=False)
+    if dialect == 'postgresql':
+        return _like_matches(term, ranked=True)
+    if fts_supported(dialect):
+        return _fts_matches(term)
+    return _like_matches(term, ranked=False)
+
+
+def rebuild_search_index():
+    """Repopulate the SQLite shadow table from the raw tables"""
+    connection = db.session.connection()
+    if not fts_supported(connection.dialect.name):
+        return False
+    connection.exec_driver_sql(f'DELETE FROM {SEARCH_TABLE}')
+    connection.exec_driver_sql(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, applicant_name, partner_name, application_number) '
+        + _SEARCH_ROW
+    )
+    db.session.commit()
+    return True
+
+
+def init_app(app):
+    """Create the search structures with the schema and register the rebuild command"""
+    table = Application.__table__
+    if not event.contains(table, 'after_create', _create_sqlite_index):
+        event.listen(table, 'after_create', _create_sqlite_index)
+        event.listen(table, 'before_drop', _drop_sqlite_index)
+        for ddl in _create_postgres_indexes:
+            event.listen(table, 'after_create', ddl)
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Repopulate the application search index."""
+        if rebuild_search_index():
+            click.echo('Search index rebuilt')
+        else:
+            click.echo('Nothing to rebuild: this database maintains its search indexes itself')
@@ -0,0 +1,185 @@
+"""
+User cache for the Flask-Login user_loader
+Every authenticated request used to start with SELECT ... FROM users WHERE
+id = ?. load_user() now keeps a per-process TTL/LRU cache of user column
+values and, on a hit, attaches them to the request's session with
+merge(load=False), which emits no SQL.
+
+Only read-only requests (GET, HEAD, OPTIONS) are served from the cache.
+Any other request loads the user from the database, so a profile update,
+password change or anything else that writes the user starts from its
+current row: the rollup hooks see the real old region and role, and
+current_password is checked against the current hash.
+
+Some columns are never cached and are left unloaded, so the first access
+reads them from the database: unread_notification_count (it changes on
+every notification) and role, is_active and password_hash. Those three
+decide what a user may do, and this per-process cache cannot see changes
+made by another worker, so a demoted or deactivated user loses access on
+their next request. Flask-Login's is_authenticated reads is_active, so
+every authenticated request runs that one narrow primary key read; the
+cache saves loading the rest of the profile, not the round trip.
+
+Entries are invalidated when a flush changes or deletes the user and
+again when that transaction commits. Other processes keep their entry
+until USER_CACHE_TTL expires, so at worst they show profile details that
+are that old. USER_CACHE_TTL = 0 disables the cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from models import db, User
+
+# Columns that change too often to cache, and the authorization columns,
+# which must not be served stale by another process
+UNCACHED_COLUMNS = {'unread_notification_count', 'role', 'is_active', 'password_hash'}
+
+# Requests that may be served from the cache; all others write
+READ_ONLY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class UserCache:
+    """Thread-safe LRU of user column values with a time to live"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires, values = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return values
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, values):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+def _cached_columns():
+    return [attr.key for attr in inspect(User).column_attrs if attr.key not in UNCACHED_COLUMNS]
+
+
+def _snapshot(user):
+    return {key: getattr(user, key) for key in _cached_columns()}
+
+
+def _attach(values):
+    """A session-bound User built from cached values, without a query"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def user_cache():
+    return current_app.extensions['user_cache']
+
+
+def load_user(user_id):
+    """Flask-Login user_loader backed by the cache"""
+    cache = user_cache()
+    if not cache.enabled or request.method not in READ_ONLY_METHODS:
+        return db.session.get(User, user_id)
+
+    values = cache.get(user_id)
+    if values is not None:
+        # The request may already have this user in its session
+        existing = db.session.identity_map.get(inspect(User).identity_key_from_primary_key((user_id,)))
+        return existing if existing is not None else _attach(values)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        cache.put(user_id, _snapshot(user))
+    return user
+
+
+def _changed_user_ids(session):
+    ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            ids.add(obj.id)
+    return ids
+
+
+def _after_flush(session, flush_context):
+    ids = _changed_user_ids(session)
+    if ids:
+        # Drop now so no request re-caches the old values before commit,
+        # and again after commit in case one did
+        cache = user_cache()
+        for user_id in ids:
+            cache.invalidate(user_id)
+        session.info.setdefault('user_cache_invalidate', set()).update(ids)
+
+
+def _after_commit(session):
+    ids = session.info.pop('user_cache_invalidate', None)
+    if ids:
+        cache = user_cache()
+        for user_id in ids:
+            cache.invalidate(user_id)
+
+
+def _after_rollback(session):
+    session.info.pop('user_cache_invalidate', None)
+
+
+def init_app(app):
+    """Create the cache and register the invalidation hooks"""
+    app.extensions['user_cache'] = UserCache(
+        maxsize=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['USER_CACHE_TTL']
+    )
+
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
@@ -17,6 +17,9 @@ import {
 } from '@heroicons/react/24/outline';
 import { notificationsAPI } from '../utils/api';
 
+// Unread count refresh when the live stream is unavailable (ms)
+const UNREAD_POLL_INTERVAL = 60000;
+
 const Layout = () => {
   const { user, logout, isCommittee } = useAuth();
   const location = useLocation();
@@ -24,7 +27,34 @@ const Layout = () => {
   const [unreadCount, setUnreadCount] = useState(0);
 
   useEffect(() => {
-    fetchUnreadCount();
+    let poll = null;
+    const startPolling = () => {
+      fetchUnreadCount();
+      poll = setInterval(fetchUnreadCount, UNREAD_POLL_INTERVAL);
+    };
+
+    // Live updates instead of polling; the server pushes the current count
+    // on connect and again whenever it changes
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => clearInterval(poll);
+    }
+
+    const stream = notificationsAPI.openStream();
+    stream.addEventListener('unread_count', (event) => {
+      setUnreadCount(JSON.parse(event.data).unread_count);
+    });
+    // A 204 (streams turned off) or 503 (server busy) closes the stream
+    // for good; dropped connections reconnect by themselves
+    stream.onerror = () => {
+      if (stream.readyState === EventSource.CLOSED && poll === null) {
+        startPolling();
+      }
+    };
+    return () => {
+      stream.close();
+      clearInterval(poll);
+    };
   }, []);
 
   const fetchUnreadCount = async () => {
@@ -119,8 +119,12 @@ export const notificationsAPI = {
   getAll: (params) => api.get('/notifications/', { params }),
   markAsRead: (id) => api.put(`/notifications/${id}/read`),
   markAllAsRead: () => api.put('/notifications/mark-all-read'),
+  markManyAsRead: (ids) => api.put('/notifications/mark-read', { ids }),
+  deleteRead: (olderThanDays) => api.delete('/notifications/read', { params: { older_than_days: olderThanDays } }),
   delete: (id) => api.delete(`/notifications/${id}`),
   getUnreadCount: () => api.get('/notifications/unread-count'),
+  // Server-sent events: 'unread_count' and 'notification'
+  openStream: () => new EventSource(`${API_URL}/notifications/stream`, { withCredentials: true }),
 };
 
 // Admin API